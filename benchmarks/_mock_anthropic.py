@@ -0,0 +1,137 @@
+"""Local stand-in for the Anthropic Messages endpoint, used by the benchmarks."""
+
+import asyncio
+import json
+import os
+from typing import Any, Callable, Optional
+
+from aiohttp import web
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "mock-key")
+
+MOCK_ANSWER = "Hello from the mock Messages endpoint."
+
+
+class MockAnthropicServer:
+    """Serve `/v1/messages` on localhost.
+
+    - `latency_sec`: delay added before every response.
+    - `latency_fn`: delay computed from the request payload instead.
+    - `fail_statuses`: statuses returned (in order) before the first success,
+      e.g. `[429, 529]` to exercise retries. A `retry-after` header is sent.
+    - `stream_chunks`: number of text deltas sent on streaming requests.
+    """
+
+    def __init__(
+        self,
+        latency_sec: float = 0.0,
+        fail_statuses: Optional[list[int]] = None,
+        retry_after_sec: float = 0.1,
+        stream_chunks: int = 20,
+        latency_fn: Optional[Callable[[dict[str, Any]], float]] = None,
+    ):
+        self.latency_sec = latency_sec
+        self.latency_fn = latency_fn
+        self.fail_statuses = list(fail_statuses or [])
+        self.retry_after_sec = retry_after_sec
+        self.stream_chunks = stream_chunks
+        self.nb_requests = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def handle_messages(self, request: web.Request) -> web.StreamResponse:
+        self.nb_requests += 1
+        payload = await request.json()
+        latency_sec = (
+            self.latency_sec if self.latency_fn is None else self.latency_fn(payload)
+        )
+        if latency_sec:
+            await asyncio.sleep(latency_sec)
+        if self.fail_statuses:
+            status = self.fail_statuses.pop(0)
+            return web.json_response(
+                {"type": "error", "error": {"type": "overloaded_error"}},
+                status=status,
+                headers={"retry-after": str(self.retry_after_sec)},
+            )
+        if payload.get("stream"):
+            return await self._stream(request)
+        return web.json_response(
+            {
+                "content": [{"type": "text", "text": MOCK_ANSWER}],
+                "usage": {"input_tokens": 10, "output_tokens": 10},
+            }
+        )
+
+    async def _stream(self, request: web.Request) -> web.StreamResponse:
+        res = web.StreamResponse(headers={"content-type": "text/event-stream"})
+        await res.prepare(request)
+        for event in build_recorded_stream(self.stream_chunks):
+            await res.write(event)
+        await res.write_eof()
+        return res
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/v1/messages", self.handle_messages)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/v1/messages"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def build_recorded_stream(nb_chunks: int = 20) -> list[bytes]:
+    """Events as sent by the Messages API for a streamed text answer."""
+    events = [
+        _sse(
+            "message_start",
+            {
+                "type": "message_start",
+                "message": {"usage": {"input_tokens": 10, "output_tokens": 1}},
+            },
+        ),
+        _sse(
+            "content_block_start",
+            {
+                "type": "content_block_start",
+                "index": 0,
+                "content_block": {"type": "text", "text": ""},
+            },
+        ),
+        _sse("ping", {"type": "ping"}),
+    ]
+    for i in range(nb_chunks):
+        events.append(
+            _sse(
+                "content_block_delta",
+                {
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": f"token{i} "},
+                },
+            )
+        )
+    events += [
+        _sse("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        _sse(
+            "message_delta",
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn"},
+                "usage": {"output_tokens": nb_chunks},
+            },
+        ),
+        _sse("message_stop", {"type": "message_stop"}),
+    ]
+    return events
@@ -0,0 +1,67 @@
+"""Local stand-in for the Slack Web API methods used by SlackBot."""
+
+import asyncio
+import itertools
+from typing import Optional
+
+from aiohttp import web
+
+MOCK_BOT_USER_ID = "UBOT"
+
+
+class MockSlackServer:
+    """Serve `auth.test`, `chat.postMessage` and `chat.update` on localhost.
+
+    - `latency_sec`: delay added before every response.
+    - `rate_limited`: number of `chat.update` calls answered with a 429 and a
+      `Retry-After` header before the others succeed.
+    """
+
+    def __init__(
+        self,
+        latency_sec: float = 0.0,
+        rate_limited: int = 0,
+        retry_after_sec: int = 1,
+    ):
+        self.latency_sec = latency_sec
+        self.rate_limited = rate_limited
+        self.retry_after_sec = retry_after_sec
+        self.calls: dict[str, int] = {}
+        self._ts = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+        self.api_url = ""
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency_sec:
+            await asyncio.sleep(self.latency_sec)
+        if method == "auth.test":
+            return web.json_response({"ok": True, "user_id": MOCK_BOT_USER_ID})
+        payload = await request.json()
+        if method == "chat.update" and self.rate_limited > 0:
+            self.rate_limited -= 1
+            return web.json_response(
+                {"ok": False, "error": "ratelimited"},
+                status=429,
+                headers={"Retry-After": str(self.retry_after_sec)},
+            )
+        ts = payload.get("ts") or f"{next(self._ts)}.000100"
+        return web.json_response(
+            {"ok": True, "channel": payload.get("channel"), "ts": ts}
+        )
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/api/{method}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.api_url = f"http://127.0.0.1:{port}/api/"
+        return self.api_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
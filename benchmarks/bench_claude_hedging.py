@@ -0,0 +1,78 @@
+"""p50/p99 latency of sequential requests, with and without hedging, against
+a mock endpoint where 5% of the requests are very slow.
+
+Usage: python -m benchmarks.bench_claude_hedging [nb_requests]
+"""
+
+import asyncio
+import random
+import sys
+import time
+from typing import Any
+
+from benchmarks._mock_anthropic import MockAnthropicServer
+from llm_agents.interfaces.llms import (
+    ClaudeClient,
+    ClaudeModel,
+    HedgePolicy,
+    LatencyTracker,
+    RequestScheduler,
+)
+from llm_agents.utils.http import PooledSession
+
+FAST_SEC = 0.05
+SLOW_SEC = 1.0
+SLOW_RATIO = 0.05
+
+
+def latency(payload: dict[str, Any]) -> float:
+    if payload["model"] == ClaudeModel.HAIKU3.value:
+        return FAST_SEC / 2
+    return SLOW_SEC if random.random() < SLOW_RATIO else FAST_SEC
+
+
+async def run(url: str, nb_requests: int, hedge: HedgePolicy | None) -> list[float]:
+    scheduler = RequestScheduler(requests_per_minute=100_000)
+    latencies = []
+    async with ClaudeClient(
+        url=url, pool=PooledSession(), scheduler=scheduler, hedge=hedge
+    ) as client:
+        for _ in range(nb_requests):
+            client.clear_history()
+            start = time.perf_counter()
+            await client.send("ping")
+            latencies.append(time.perf_counter() - start)
+        if client.hedge_metrics is not None:
+            metrics = client.hedge_metrics
+            print(
+                f"  hedged: {metrics.hedge_rate:.1%}, "
+                f"hedge win rate: {metrics.hedge_win_rate:.1%}, "
+                f"over budget: {metrics.nb_over_budget}"
+            )
+    return latencies
+
+
+def summary(latencies: list[float]) -> str:
+    tracker = LatencyTracker(window=len(latencies))
+    for latency_sec in latencies:
+        tracker.record(latency_sec)
+    p50, p99 = tracker.percentile(0.5), tracker.percentile(0.99)
+    return f"p50: {p50 * 1000:.0f} ms, p99: {p99 * 1000:.0f} ms"
+
+
+async def main(nb_requests: int) -> None:
+    random.seed(0)
+    server = MockAnthropicServer(latency_fn=latency)
+    url = await server.start()
+    try:
+        print("no hedging")
+        print(f"  {summary(await run(url, nb_requests, None))}")
+        print("hedging after p90, on haiku")
+        policy = HedgePolicy(percentile=0.9, hedge_model=ClaudeModel.HAIKU3)
+        print(f"  {summary(await run(url, nb_requests, policy))}")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
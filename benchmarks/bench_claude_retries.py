@@ -0,0 +1,39 @@
+"""Exercise the request scheduler against a mock endpoint injecting 429/529.
+
+Usage: python -m benchmarks.bench_claude_retries [nb_requests]
+"""
+
+import asyncio
+import sys
+import time
+
+from benchmarks._mock_anthropic import MockAnthropicServer
+from llm_agents.interfaces.llms import ClaudeClient, RequestScheduler, RetryPolicy
+from llm_agents.utils.http import PooledSession
+
+
+async def main(nb_requests: int) -> None:
+    server = MockAnthropicServer(
+        fail_statuses=[429, 529, 529, 429], retry_after_sec=0.2
+    )
+    url = await server.start()
+    scheduler = RequestScheduler(
+        requests_per_minute=600,
+        tokens_per_minute=1_000_000,
+        retry_policy=RetryPolicy(base_delay_sec=0.05),
+    )
+    start = time.perf_counter()
+    try:
+        async with ClaudeClient(
+            url=url, pool=PooledSession(), scheduler=scheduler
+        ) as client:
+            await asyncio.gather(*(client.send("ping") for _ in range(nb_requests)))
+    finally:
+        await server.stop()
+    elapsed = time.perf_counter() - start
+    print(f"requests: {nb_requests} in {elapsed:.2f}s (limit: 600 requests/min)")
+    print(f"server hits: {server.nb_requests}, stats: {scheduler.stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
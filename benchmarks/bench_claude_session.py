@@ -0,0 +1,50 @@
+"""Compare a fresh HTTP session per call against the pooled session.
+
+Usage: python -m benchmarks.bench_claude_session [nb_requests]
+"""
+
+import asyncio
+import sys
+import time
+
+from benchmarks._mock_anthropic import MockAnthropicServer
+from llm_agents.interfaces.llms import ClaudeClient, RequestScheduler
+from llm_agents.utils.http import PooledSession
+
+
+async def run_fresh_session(url: str, nb_requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(nb_requests):
+        async with ClaudeClient(
+            url=url, pool=PooledSession(), scheduler=RequestScheduler()
+        ) as client:
+            await client.send("ping")
+    return time.perf_counter() - start
+
+
+async def run_pooled_session(url: str, nb_requests: int) -> float:
+    start = time.perf_counter()
+    async with ClaudeClient(
+        url=url, pool=PooledSession(), scheduler=RequestScheduler()
+    ) as client:
+        for _ in range(nb_requests):
+            client.clear_history()
+            await client.send("ping")
+    return time.perf_counter() - start
+
+
+async def main(nb_requests: int) -> None:
+    server = MockAnthropicServer()
+    url = await server.start()
+    try:
+        fresh = await run_fresh_session(url, nb_requests)
+        pooled = await run_pooled_session(url, nb_requests)
+    finally:
+        await server.stop()
+    print(f"requests: {nb_requests}")
+    print(f"fresh session per call: {1000 * fresh / nb_requests:.2f} ms/request")
+    print(f"pooled session:         {1000 * pooled / nb_requests:.2f} ms/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,81 @@
+"""Fan-out workflow run with sequential awaits vs the DAG engine.
+
+The workflow: classify the question, then 4 independent steps (entity
+extraction, SQL generation, documentation search, examples), then a
+synthesis. Each step is a sleep standing for an LLM call.
+
+Usage: python -m benchmarks.bench_dag_engine [step_sec]
+"""
+
+import asyncio
+import sys
+import time
+from typing import Any
+
+from llm_agents.dags._base import AgentBase, AgentIO
+from llm_agents.dags.engine import DAGEngine, DAGNode
+from llm_agents.interfaces.bots import MessageContext, UserInput
+from llm_agents.interfaces.llms import ClaudeClient, Prompt
+from llm_agents.utils.http import PooledSession
+
+
+class NoBot:
+    async def send_message(self, context: MessageContext, **_: Any) -> str:
+        context.message_id = "0"
+        return context.message_id
+
+
+class StepAgent(AgentBase):
+    TASK_DESCRIPTION = "Stand for an LLM call"
+    CORE_SYSTEM_PROMPT = Prompt("")
+
+    async def execute(self, *args: Any, **kwargs: Any) -> AgentIO:
+        await asyncio.sleep(kwargs["step_sec"])
+        self.agent_io.data[self.task_tag] = True
+        return self.agent_io
+
+
+def build_nodes(step_sec: float) -> list[DAGNode]:
+    def node(name: str, depends_on: tuple[str, ...] = ()) -> DAGNode:
+        return DAGNode(
+            name,
+            StepAgent,
+            depends_on,
+            agent_kwargs={"llm": ClaudeClient(pool=PooledSession())},
+            execute_kwargs={"step_sec": step_sec},
+        )
+
+    branches = ("entities", "sql", "docs", "examples")
+    return [
+        node("classify"),
+        *(node(branch, ("classify",)) for branch in branches),
+        node("synthesis", branches),
+    ]
+
+
+async def run_sequential(nodes: list[DAGNode], agent_io: AgentIO) -> None:
+    for i, node in enumerate(nodes):
+        agent = node.build_agent(agent_io, agent_io.bot, i + 1, len(nodes))
+        await agent.execute(**node.execute_kwargs)
+
+
+async def main(step_sec: float) -> None:
+    nodes = build_nodes(step_sec)
+    user_input = UserInput(message="", channel_id="C1")
+
+    start = time.perf_counter()
+    await run_sequential(nodes, AgentIO(user_input, NoBot()))
+    sequential = time.perf_counter() - start
+
+    engine = DAGEngine(nodes, show_progress=False)
+    start = time.perf_counter()
+    await engine.run(AgentIO(user_input, NoBot()))
+    parallel = time.perf_counter() - start
+
+    print(f"{len(nodes)} steps of {step_sec:.2f}s, critical path of 3 steps")
+    print(f"sequential awaits: {sequential:.2f}s")
+    print(f"DAG engine:        {parallel:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.5))
@@ -0,0 +1,98 @@
+"""End-to-end latency of DAG steps run with a progress message.
+
+Measures the dead time between the end of an agent's task and the delivery
+of its final ("done") header, for the former polling loop (task checked
+every `header_switch_speed` seconds) and for `execute_with_progress`,
+against a local fake Slack API.
+
+Usage: python -m benchmarks.bench_progress_latency [nb_steps]
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+from typing import Any
+
+from benchmarks._mock_slack import MockSlackServer
+from llm_agents.dags._base import AgentBase, AgentIO
+from llm_agents.interfaces.bots import UserInput
+from llm_agents.interfaces.bots._base import build_header_generator, get_header_done
+from llm_agents.interfaces.bots.slack import SlackBot
+from llm_agents.interfaces.llms import ClaudeClient, Prompt
+from llm_agents.utils.http import PooledSession
+
+HEADER_SWITCH_SPEED = 1.0  # former default
+LATENCY_SEC = 0.01
+
+
+class SleepAgent(AgentBase):
+    TASK_DESCRIPTION = "Wait for a while"
+    CORE_SYSTEM_PROMPT = Prompt("")
+
+    async def execute(self, *args: Any, **kwargs: Any) -> AgentIO:
+        await asyncio.sleep(kwargs["duration"])
+        self.finished_at = (
+            time.monotonic()
+        )  # pylint: disable=attribute-defined-outside-init
+        return self.agent_io
+
+
+async def execute_with_polling(agent: SleepAgent, **kwargs: Any) -> AgentIO:
+    """The former `execute_with_progress` loop."""
+    context = agent.agent_io.context
+    header_generator = build_header_generator(agent.task_progress_message)
+    task = asyncio.create_task(agent.execute(**kwargs))
+    context.header = next(header_generator)
+    await agent.outbox.send(context)
+    while not task.done():
+        context.header = next(header_generator)
+        agent.outbox.submit(context)
+        await asyncio.sleep(HEADER_SWITCH_SPEED)
+    context.header = get_header_done()
+    await agent.outbox.send(context)
+    return await task
+
+
+async def step(bot: SlackBot, i: int, polling: bool) -> float:
+    """Run one step, return the time from its end to its final header."""
+    user_input = UserInput(message="", channel_id=f"C{i}", thread_id=f"{i}.0")
+    agent = SleepAgent(
+        "sleep",
+        AgentIO(user_input, bot),
+        bot,
+        llm=ClaudeClient(pool=PooledSession()),
+    )
+    duration = random.uniform(0.5, 3.0)
+    if polling:
+        await execute_with_polling(agent, duration=duration)
+    else:
+        await agent.execute_with_progress(duration=duration)
+    return time.monotonic() - agent.finished_at
+
+
+async def main(nb_steps: int) -> None:
+    server = MockSlackServer(latency_sec=LATENCY_SEC)
+    api_url = await server.start()
+    bot = SlackBot({"token": "xoxb-mock"}, api_url=api_url, pool=PooledSession())
+    await bot.start()
+    try:
+        print(f"{nb_steps} concurrent steps of 0.5-3s, one channel each")
+        for label, polling in (("polling", True), ("event-driven", False)):
+            random.seed(0)
+            dead_times = await asyncio.gather(
+                *(step(bot, i, polling) for i in range(nb_steps))
+            )
+            print(
+                f"{label:>12}: dead time after the task "
+                f"mean {1000 * statistics.mean(dead_times):6.1f} ms, "
+                f"max {1000 * max(dead_times):6.1f} ms"
+            )
+    finally:
+        await bot.transport.aclose()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
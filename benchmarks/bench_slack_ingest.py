@@ -0,0 +1,120 @@
+"""Throughput of the Slack event ingest path, from the decoded request body
+to the `UserInput` handed to the DAG (or to the event being dropped).
+
+The event mix is typical of a bot answering in threads: each user message
+is followed by the bot's own messages and the edits of its progress
+messages, which Slack also sends as events.
+
+Usage: python -m benchmarks.bench_slack_ingest [nb_events]
+"""
+
+import asyncio
+import copy
+import sys
+import time
+from typing import Any, Callable
+
+from benchmarks._mock_slack import MOCK_BOT_USER_ID, MockSlackServer
+from llm_agents.interfaces.bots import UserInput
+from llm_agents.interfaces.bots.slack import SlackBot, SlackEventsAPIInput
+from llm_agents.utils.http import PooledSession
+
+USER_MESSAGE: dict[str, Any] = {
+    "token": "random_verification_token",
+    "team_id": "T12345",
+    "api_app_id": "A12345",
+    "event": {
+        "type": "message",
+        "user": "U12345",
+        "text": "Combien de clients actifs avons-nous ce mois-ci ?",
+        "channel": "C12345",
+        "ts": "1617000000.000200",
+        "client_msg_id": "8c3b2f0a",
+        "blocks": [{"type": "rich_text", "elements": []}],
+    },
+    "type": "event_callback",
+    "event_id": "Ev12345",
+    "event_time": 1617000000,
+    "authorizations": [{"team_id": "T12345", "user_id": MOCK_BOT_USER_ID}],
+    "is_ext_shared_channel": False,
+}
+
+
+def build_events(nb_events: int) -> list[dict[str, Any]]:
+    """1 user message for 1 bot message and 3 edits of bot messages."""
+    bot_message = copy.deepcopy(USER_MESSAGE)
+    bot_message["event"].update({"user": MOCK_BOT_USER_ID, "bot_id": "B12345"})
+    bot_edit = copy.deepcopy(USER_MESSAGE)
+    bot_edit["event"] = {
+        "type": "message",
+        "subtype": "message_changed",
+        "channel": "C12345",
+        "ts": "1617000001.000300",
+        "message": bot_message["event"],
+        "previous_message": bot_message["event"],
+    }
+    pattern = [USER_MESSAGE, bot_message, bot_edit, bot_edit, bot_edit]
+    return [pattern[i % len(pattern)] for i in range(nb_events)]
+
+
+def ingest_before(bot: SlackBot, body: dict[str, Any]) -> UserInput | None:
+    """The former path: a model built for every event, then dropped if from
+    the bot."""
+    api_input = SlackEventsAPIInput(**body)
+    user_input = UserInput(
+        app_id=api_input.api_app_id,
+        workspace_id=api_input.team_id,
+        channel_id=api_input.event.channel,
+        thread_id=api_input.event.ts,
+        user_id=api_input.event.user,
+        message_id=api_input.event.ts,
+        message_ts=api_input.event.ts,
+        message=api_input.event.text,
+        event_type=api_input.event.type,
+        is_bot=bot.is_message_from_bot(api_input.event.user),
+    )
+    return None if user_input.is_bot else user_input
+
+
+def ingest_after(bot: SlackBot, body: dict[str, Any]) -> UserInput | None:
+    if bot.is_ignored_event(body):
+        return None
+    return bot.build_user_input(body)
+
+
+def measure(
+    ingest: Callable[[SlackBot, dict[str, Any]], Any],
+    bot: SlackBot,
+    events: list[dict[str, Any]],
+) -> tuple[float, int]:
+    start = time.perf_counter()
+    nb_failed = 0
+    for body in events:
+        try:
+            ingest(bot, body)
+        except Exception:  # pylint: disable=broad-exception-caught
+            nb_failed += 1  # e.g. edits have no "user": rejected by validation
+    return len(events) / (time.perf_counter() - start), nb_failed
+
+
+async def main(nb_events: int) -> None:
+    server = MockSlackServer()
+    api_url = await server.start()
+    try:
+        bot = SlackBot({"token": "xoxb-mock"}, api_url=api_url, pool=PooledSession())
+        await bot.start()
+        await bot.transport.aclose()
+    finally:
+        await server.stop()
+    events = build_events(nb_events)
+    print(f"{nb_events} events, 1 in 5 written by a user")
+    for label, ingest in (("before", ingest_before), ("after", ingest_after)):
+        events_per_sec, nb_failed = measure(ingest, bot, events)
+        print(
+            f"{label:>6}: {events_per_sec:9.0f} events/s "
+            f"({nb_failed} failed validation)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,85 @@
+"""Progress animations of many agents sharing a few Slack channels.
+
+Each agent edits its own message every `TICK_SEC`. Compares one
+`chat.update` per tick (as before) with the coalescing outbox, against a
+local fake Slack API which rate-limits the first few updates.
+
+Usage: python -m benchmarks.bench_slack_outbox [nb_agents] [nb_channels]
+"""
+
+import asyncio
+import sys
+import time
+
+from benchmarks._mock_slack import MockSlackServer
+from llm_agents.interfaces.bots import MessageContext, MessageOutbox
+from llm_agents.interfaces.bots.slack import SlackBot, SlackMessageSendError
+from llm_agents.utils.http import PooledSession
+
+TICK_SEC = 0.1
+DURATION_SEC = 3.0
+LATENCY_SEC = 0.01
+
+
+async def agent(
+    bot: SlackBot, outbox: MessageOutbox, i: int, nb_channels: int, coalesce: bool
+) -> int:
+    """Animate a message for DURATION_SEC, return the number of failed calls."""
+    context = MessageContext(channel_id=f"C{i % nb_channels}", header="start")
+    await outbox.send(context)
+    nb_failed = 0
+    end = time.monotonic() + DURATION_SEC
+    tick = 0
+    while time.monotonic() < end:
+        tick += 1
+        context.header = f"agent {i} tick {tick}"
+        if coalesce:
+            outbox.submit(context)
+        else:
+            try:
+                await bot.send_message(context)
+            except SlackMessageSendError:
+                nb_failed += 1
+        await asyncio.sleep(TICK_SEC)
+    context.header = "done"
+    await outbox.send(context)
+    return nb_failed
+
+
+async def run(nb_agents: int, nb_channels: int, coalesce: bool) -> None:
+    server = MockSlackServer(latency_sec=LATENCY_SEC, rate_limited=5)
+    api_url = await server.start()
+    bot = SlackBot({"token": "xoxb-mock"}, api_url=api_url, pool=PooledSession())
+    await bot.start()
+    outbox = MessageOutbox(bot)
+    try:
+        failures = await asyncio.gather(
+            *(agent(bot, outbox, i, nb_channels, coalesce) for i in range(nb_agents))
+        )
+    finally:
+        await bot.transport.aclose()
+        await server.stop()
+    label = "outbox          " if coalesce else "update per tick "
+    print(
+        f"{label}: {server.calls.get('chat.update', 0):5d} chat.update, "
+        f"{sum(failures):3d} failed, {outbox.stats.nb_superseded:5d} frames dropped, "
+        f"{outbox.stats.nb_rate_limited} retry-after honoured"
+    )
+
+
+async def main(nb_agents: int, nb_channels: int) -> None:
+    print(
+        f"{nb_agents} agents in {nb_channels} channels, "
+        f"one frame every {1000 * TICK_SEC:.0f} ms for {DURATION_SEC:.0f}s"
+    )
+    await run(nb_agents, nb_channels, coalesce=False)
+    await run(nb_agents, nb_channels, coalesce=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+        )
+    )
@@ -0,0 +1,85 @@
+"""Many concurrent conversations posting and editing Slack messages.
+
+Compares the blocking transport (requests, called from async code as before)
+with the async one, against a local fake Slack API.
+
+Usage: python -m benchmarks.bench_slack_transport [nb_conversations]
+"""
+
+import asyncio
+import sys
+import time
+
+import requests
+
+from benchmarks._mock_slack import MockSlackServer
+from llm_agents.interfaces.bots import MessageContext
+from llm_agents.interfaces.bots.slack import SlackBot
+from llm_agents.utils.http import PooledSession
+
+NB_UPDATES = 5
+LATENCY_SEC = 0.02
+
+
+def send_message_blocking(bot: SlackBot, context: MessageContext) -> None:
+    """How messages were sent before: requests.post from the event loop."""
+    method = (
+        bot.METHOD_POST_MESSAGE
+        if context.message_id is None
+        else bot.METHOD_UPDATE_MESSAGE
+    )
+    response = requests.post(
+        bot.api_url + method,
+        json=bot._build_message_payload(context),  # pylint: disable=protected-access
+        headers={"Authorization": f"Bearer {bot.bot_token}"},
+        timeout=30,
+    )
+    context.message_id = response.json()["ts"]
+
+
+async def conversation(bot: SlackBot, i: int, blocking: bool) -> None:
+    context = MessageContext(channel_id=f"C{i}", header=f"conversation {i}")
+    for _ in range(NB_UPDATES):
+        if blocking:
+            send_message_blocking(bot, context)
+        else:
+            await bot.send_message(context)
+
+
+async def run(api_url: str, nb_conversations: int, blocking: bool) -> float:
+    bot = SlackBot({"token": "xoxb-mock"}, api_url=api_url, pool=PooledSession())
+    await bot.start()
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(conversation(bot, i, blocking) for i in range(nb_conversations))
+    )
+    elapsed = time.perf_counter() - start
+    await bot.transport.aclose()
+    return elapsed
+
+
+async def main(nb_conversations: int) -> None:
+    server = MockSlackServer(latency_sec=LATENCY_SEC)
+    api_url = await server.start()
+    try:
+        # the blocking client cannot reach a server running on its own loop
+        blocking = await asyncio.to_thread(
+            asyncio.run, run(api_url, nb_conversations, blocking=True)
+        )
+        non_blocking = await run(api_url, nb_conversations, blocking=False)
+    finally:
+        await server.stop()
+    nb_calls = nb_conversations * NB_UPDATES
+    print(f"{nb_conversations} conversations x {NB_UPDATES} updates")
+    print(f"(fake Slack latency: {1000 * LATENCY_SEC:.0f} ms)")
+    print(
+        f"blocking requests.post: {blocking:.2f}s ({nb_calls / blocking:.0f} calls/s)"
+    )
+    print(
+        f"async transport:        {non_blocking:.2f}s "
+        f"({nb_calls / non_blocking:.0f} calls/s)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,72 @@
+"""Compare the line-by-line stream parsing with SSEParser on a recorded stream.
+
+Usage: python -m benchmarks.bench_sse_parser [nb_streams]
+"""
+
+import json
+import random
+import sys
+import time
+
+from benchmarks._mock_anthropic import build_recorded_stream
+from llm_agents.interfaces.llms.anthropic import SKIPPED_STREAM_EVENTS
+from llm_agents.interfaces.llms.sse import SSEParser
+
+
+def chunk_stream(events: list[bytes], seed: int = 0) -> list[bytes]:
+    """Re-cut the stream at random offsets, like TCP reads would."""
+    raw = b"".join(events)
+    rng = random.Random(seed)
+    chunks, start = [], 0
+    while start < len(raw):
+        end = start + rng.randint(16, 512)
+        chunks.append(raw[start:end])
+        start = end
+    return chunks
+
+
+def parse_lines(chunks: list[bytes]) -> str:
+    """Previous implementation: decode, strip and json.loads every data line."""
+    answer = ""
+    current_event = ""
+    lines = b"".join(chunks).split(b"\n")  # what StreamReader iteration yields
+    for line in lines:
+        line = line.decode("utf-8").strip()
+        if not line:
+            continue
+        if line.startswith("event: "):
+            current_event = line[7:]
+            continue
+        if not line.startswith("data: "):
+            continue
+        data = json.loads(line[6:])
+        if current_event == "content_block_delta":
+            answer += data["delta"]["text"]
+        elif current_event == "message_stop":
+            break
+    return answer
+
+
+def parse_sse(chunks: list[bytes]) -> str:
+    parser = SSEParser(skip_events=SKIPPED_STREAM_EVENTS)
+    parts: list[str] = []
+    for chunk in chunks:
+        for event in parser.feed(chunk):
+            if event.event == "content_block_delta":
+                parts.append(event.json()["delta"]["text"])
+    return "".join(parts)
+
+
+def main(nb_streams: int) -> None:
+    chunks = chunk_stream(build_recorded_stream(nb_chunks=300))
+    assert parse_lines(chunks) == parse_sse(chunks)
+    for name, parse in [("line-based", parse_lines), ("SSEParser", parse_sse)]:
+        start = time.perf_counter()
+        for _ in range(nb_streams):
+            parse(chunks)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {1e6 * elapsed / nb_streams:.1f} us/stream (300 deltas)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -1,21 +1,36 @@
 import asyncio
 import time
 from abc import ABC, abstractmethod
+from dataclasses import asdict
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, ClassVar, Dict, Optional
 
 from llm_agents.interfaces.bots._base import (
     PROGRESS_TEXT_DEFAULT,
     Bot,
+    MessageContext,
     UserInput,
     build_header_generator,
     get_header_done,
+    get_header_error,
+    get_header_timeout,
 )
+from llm_agents.interfaces.bots.outbox import MessageOutbox, get_outbox
+from llm_agents.interfaces.bots.progress import ProgressTicker, get_progress_ticker
+from llm_agents.interfaces.bots.streaming import StreamingMessage
 from llm_agents.interfaces.llms._base import LLMClient, Prompt
 from llm_agents.interfaces.llms.anthropic import ClaudeClient, ClaudeModel
+from llm_agents.interfaces.llms.limiter import Priority, priority_scope
+from llm_agents.utils.deadline import (
+    Deadline,
+    DeadlineExceededError,
+    current_deadline,
+    deadline_scope,
+    earliest,
+    is_deadline_exceeded,
+)
 
 PROMPT_SEPARATOR = "=" * 20
-DEFAULT_HEADER_SWITCH_SPEED = 1
 
 
 ############################################################################
@@ -52,6 +67,12 @@ class AgentDAGErrorMessages(Enum):
 
 
 class AgentIO:
+    """State of one DAG run. `context` is the bot message answering the user:
+    it belongs to this run only, so concurrent runs can share a bot.
+    `deadline` is the time by which the run must be done: agents, LLM calls
+    and queries are stopped when it expires. `timeout_notified` is set once
+    the user has been told the run timed out, so they are told only once.
+    Neither is serialized."""
 
     def __init__(
         self,
@@ -59,11 +80,18 @@ class AgentIO:
         bot: Bot,
         data: Optional[dict[str, Any]] = None,
         processing_time: float = 0,
+        context: Optional[MessageContext] = None,
+        deadline: Optional[Deadline] = None,
     ):
         self.user_input: UserInput = user_input
         self.bot = bot
         self.data: dict[str, Any] = data if data is not None else {}
         self.processing_time: float = processing_time
+        self.context: MessageContext = (
+            MessageContext.from_user_input(user_input) if context is None else context
+        )
+        self.deadline = deadline
+        self.timeout_notified = False
 
     def __repr__(self) -> str:
         out_list = [
@@ -75,19 +103,40 @@ class AgentIO:
         ]
         return "\n".join(out_list)
 
-    def to_json(self):
+    def to_json(self) -> dict[str, Any]:
         out = {
-            "user_input": self.user_input.asdict(),
+            "user_input": asdict(self.user_input),
             "data": self.data,
             "processing_time": self.processing_time,
+            "context": asdict(self.context),
         }
         return out
 
+    @classmethod
+    def from_json(cls, payload: dict[str, Any], bot: Bot) -> "AgentIO":
+        """Inverse of `to_json`."""
+        context = payload.get("context")
+        return cls(
+            user_input=UserInput(**payload["user_input"]),
+            bot=bot,
+            data=payload.get("data"),
+            processing_time=payload.get("processing_time", 0),
+            context=None if context is None else MessageContext(**context),
+        )
+
 
 class AgentBase(ABC):
 
     TASK_DESCRIPTION: str
     CORE_SYSTEM_PROMPT: Prompt
+    # Opt-in memoization by the DAG engine (see dags/memo.py), for agents
+    # whose outputs only depend on their prompt, the user message and these
+    # keys of AgentIO.data. MEMO_OUTPUT_KEYS are the keys the agent writes.
+    MEMO_INPUT_KEYS: ClassVar[Optional[tuple[str, ...]]] = None
+    MEMO_OUTPUT_KEYS: ClassVar[tuple[str, ...]] = ()
+    # queueing class of the LLM calls made by `execute_with_progress`: DAG
+    # steps give way to the replies users are waiting for
+    PRIORITY: ClassVar[Priority] = Priority.BACKGROUND
 
     def __init__(
         self,
@@ -101,6 +150,8 @@ class AgentBase(ABC):
         task_num: Optional[int] = None,
         task_total: Optional[int] = None,
         task_progress_message: Optional[str] = None,
+        outbox: Optional[MessageOutbox] = None,
+        ticker: Optional[ProgressTicker] = None,
     ):
         self.task_tag = task_tag
         self.agent_io = agent_io
@@ -110,10 +161,16 @@ class AgentBase(ABC):
             else task_progress_message
         )
         self.bot = bot
+        self.outbox = get_outbox(bot) if outbox is None else outbox
+        self.ticker = get_progress_ticker(bot) if ticker is None else ticker
+        # the core prompt is shared by every run of the agent: cache it
+        core_prompt = Prompt(
+            self.CORE_SYSTEM_PROMPT, cache=bool(self.CORE_SYSTEM_PROMPT().strip())
+        )
         if prompts is None:
-            self.system_prompt = Prompt(self.CORE_SYSTEM_PROMPT)
+            self.system_prompt = core_prompt
         else:
-            self.system_prompt = Prompt(self.CORE_SYSTEM_PROMPT) + Prompt(prompts)
+            self.system_prompt = core_prompt + Prompt(prompts)
         self.llm = llm if llm is not None else ClaudeClient(model=ClaudeModel.SONNET3P5)
         self.llm.system_prompt = self.system_prompt
         self.task_num = task_num
@@ -123,47 +180,74 @@ class AgentBase(ABC):
     async def execute(self, *args: Any, **kwargs: Any) -> AgentIO:
         pass  # pylint: disable=arguments-differ
 
-    async def execute_with_progress(
-        self,
-        header_switch_speed: float = DEFAULT_HEADER_SWITCH_SPEED,
-        **kwargs: Any,
-    ) -> AgentIO:
-        """Execute the agent while sending a "progress" message to the user"""
-
-        # channel_id = self.agent_io.user_input.channel_id
-        # thread_id = self.agent_io.user_input.thread_id
-        message_id = self.bot.current_bot_message_id
-        thread_id = self.bot.current_bot_thread_id
-        channel_id = self.bot.current_bot_channel_id
+    async def execute_with_progress(self, **kwargs: Any) -> AgentIO:
+        """Execute the agent while sending a "progress" message to the user.
+
+        The header is animated by the bot's shared `ProgressTicker`, and the
+        final header is sent as soon as the task is done, an error header if
+        it failed. If the run's deadline expires first, the task is
+        cancelled, the user is told and DeadlineExceededError is raised.
+        """
+
+        context = self.agent_io.context
         header_generator = build_header_generator(
             self.task_progress_message, self.task_num, self.task_total
         )
 
-        task = asyncio.create_task(self.execute(**kwargs))
+        deadline = earliest(self.agent_io.deadline, current_deadline())
+        with deadline_scope(deadline), priority_scope(self.PRIORITY):
+            task = asyncio.create_task(self.execute(**kwargs))
 
-        self.bot.flush()
-        self.bot.current_header = next(header_generator)
-        bot_message_id = self.bot.send_message(channel_id, thread_id, message_id)
+        context.flush()
+        context.header = next(header_generator)
+        await self.outbox.send(context)
 
         start_time = time.monotonic()
-        while not task.done():
-            self.bot.current_header = next(header_generator)
-            self.bot.send_message(channel_id, thread_id, bot_message_id)
-            await asyncio.sleep(header_switch_speed)
-            if task.done():
-                break
+        self.ticker.register(context, header_generator, task=task)
+        done, _ = await asyncio.wait(
+            {task}, timeout=None if deadline is None else deadline.remaining()
+        )
+        if not done:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
         end_time = time.monotonic()
         time_elapsed = end_time - start_time
         self.agent_io.processing_time += time_elapsed
-        self.bot.current_header = get_header_done(
-            time_elapsed=self.agent_io.processing_time
+        # the clients used by the agent stop at the same deadline: the task
+        # may be done, having failed on it
+        timed_out = not done or (
+            not task.cancelled() and is_deadline_exceeded(task.exception())
         )
-        self.bot.send_message(channel_id, thread_id, bot_message_id)
+        if timed_out:
+            context.header = get_header_timeout(self.agent_io.processing_time)
+            await self.outbox.send(context)
+            self.agent_io.timeout_notified = True
+            if not done:
+                raise DeadlineExceededError(
+                    f"Agent '{self.task_tag}' exceeded its deadline"
+                )
+            return await task  # raises its timeout error
+        if task.cancelled() or task.exception() is not None:
+            context.header = get_header_error(self.agent_io.processing_time)
+            await self.outbox.send(context)
+            return await task  # raises its error
+        context.header = get_header_done(time_elapsed=self.agent_io.processing_time)
+        await self.outbox.send(context)
 
         task_output: AgentIO = await task
 
         return task_output
 
+    async def stream_answer(self, message: str, **kwargs: Any) -> str:
+        """Send a message to the LLM and stream its answer into a new message
+        of the user's thread. Returns the full answer. The user reads it as
+        it comes: the request is interactive unless told otherwise."""
+        kwargs.setdefault("priority", Priority.INTERACTIVE)
+        streaming_message = StreamingMessage(
+            self.bot, self.agent_io.context.new_message(), outbox=self.outbox
+        )
+        return await streaming_message.pipe(self.llm.stream_text(message, **kwargs))
+
 
 class AgentDAG(ABC):
     """An agentic Directed Acyclic Graph (also called Workflow)"""
@@ -171,5 +255,9 @@ class AgentDAG(ABC):
     def __init__(self, bot: Bot):
         self.bot: Bot = bot
 
+    def build_agent_io(self, user_input: UserInput) -> AgentIO:
+        """A fresh AgentIO (and message context) for one run of the DAG."""
+        return AgentIO(user_input, self.bot)
+
     @abstractmethod
     async def execute(self, agent_io: AgentIO) -> AgentIO: ...
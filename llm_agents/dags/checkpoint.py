@@ -0,0 +1,96 @@
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+from llm_agents.dags._base import AgentIO
+from llm_agents.interfaces.bots._base import UserInput
+
+CHECKPOINT_TTL_SEC_DEFAULT = 24 * 3600
+
+
+def checkpoint_run_id(user_input: UserInput) -> str:
+    """ID of the run answering a message: the same for every retry of it."""
+    return ":".join(
+        [user_input.workspace_id, user_input.channel_id, user_input.message_id]
+    )
+
+
+@dataclass
+class Checkpoint:
+    run_id: str
+    agent_io: dict[str, Any]  # AgentIO.to_json()
+    done_nodes: list[str]
+    updated_at: float
+
+
+class SQLiteCheckpointStore:
+    """Last state of the unfinished DAG runs, in a SQLite database.
+
+    After each node, the run's `AgentIO` (see `AgentIO.to_json`) and the
+    nodes done so far are saved under the run ID, so a failed run can be
+    resumed from its last successful node. Checkpoints of finished runs are
+    deleted, those older than `ttl_sec` are ignored and purged.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = ":memory:",
+        ttl_sec: float = CHECKPOINT_TTL_SEC_DEFAULT,
+    ):
+        self.ttl_sec = ttl_sec
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                run_id TEXT PRIMARY KEY,
+                agent_io TEXT NOT NULL,
+                done_nodes TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """)
+        self.connection.commit()
+
+    def save(self, run_id: str, agent_io: AgentIO, done_nodes: Iterable[str]) -> bool:
+        """Checkpoint the run. Returns False if its data is not JSON
+        serializable, in which case the previous checkpoint is kept."""
+        try:
+            payload = json.dumps(agent_io.to_json(), ensure_ascii=False)
+        except (TypeError, ValueError):  # e.g. circular references
+            return False
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(run_id, agent_io, done_nodes, updated_at) VALUES (?, ?, ?, ?)",
+                (run_id, payload, json.dumps(sorted(done_nodes)), time.time()),
+            )
+        return True
+
+    def load(self, run_id: str) -> Optional[Checkpoint]:
+        row = self.connection.execute(
+            "SELECT agent_io, done_nodes, updated_at FROM checkpoints "
+            "WHERE run_id = ? AND updated_at >= ?",
+            (run_id, time.time() - self.ttl_sec),
+        ).fetchone()
+        if row is None:
+            return None
+        agent_io, done_nodes, updated_at = row
+        return Checkpoint(
+            run_id=run_id,
+            agent_io=json.loads(agent_io),
+            done_nodes=json.loads(done_nodes),
+            updated_at=updated_at,
+        )
+
+    def delete(self, run_id: str) -> None:
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM checkpoints WHERE run_id = ? OR updated_at < ?",
+                (run_id, time.time() - self.ttl_sec),
+            )
+
+    def close(self) -> None:
+        self.connection.close()
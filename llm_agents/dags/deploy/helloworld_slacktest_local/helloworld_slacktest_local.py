@@ -1,29 +1,67 @@
-from fastapi import BackgroundTasks, FastAPI, Request
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from llm_agents.dags.helloworld_dag import HelloWorldDAG
-from llm_agents.interfaces.bots import SlackBot
-
-APP = FastAPI()
+from llm_agents.dags.job_queue import DAGJobQueue
+from llm_agents.dags.job_store import SQLiteJobStore
+from llm_agents.interfaces.bots import EventDeduplicator, SlackBot
+from llm_agents.interfaces.bots.slack import SlackChallengeException
 
 SLACK_BOT = SlackBot()
 DAG = HelloWorldDAG(SLACK_BOT)
+DEDUPLICATOR = EventDeduplicator()
+# runs left unfinished by the previous process are resumed on startup
+JOB_QUEUE = DAGJobQueue(DAG, store=SQLiteJobStore("helloworld_jobs.sqlite"))
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # bot identity from the local cache, or fetched without blocking
+    await SLACK_BOT.start()
+    JOB_QUEUE.start()
+    yield
+    # finish the queued runs before exiting
+    await JOB_QUEUE.stop()
+
+
+APP = FastAPI(lifespan=lifespan)
 
 
 @APP.post("/event/message")
-async def slack_event_message(
-    request: Request, background_tasks: BackgroundTasks
-) -> JSONResponse:
+async def slack_event_message(request: Request) -> JSONResponse:
     body = await request.json()
 
-    output = DAG.bot.check_for_early_exit(body)
-    if output is not None:
-        return JSONResponse(content=output.model_dump(), status_code=200)
+    # Slack re-sends events acknowledged too slowly: run each event once
+    if DEDUPLICATOR.is_duplicate(body, request.headers):
+        return JSONResponse(content={}, status_code=200)
+    # e.g. the bot's own messages, dropped before any validation
+    if SLACK_BOT.is_ignored_event(body):
+        return JSONResponse(content={}, status_code=200)
 
-    background_tasks.add_task(DAG.execute, body)
+    try:
+        user_input = DAG.bot.build_user_input(body)
+        if user_input.is_bot:
+            return JSONResponse(content={}, status_code=200)
+        # each event gets its own AgentIO, so concurrent runs share the bot safely
+        JOB_QUEUE.submit(DAG.build_agent_io(user_input))
+    except SlackChallengeException:
+        return JSONResponse(content={"challenge": body["challenge"]}, status_code=200)
+    except Exception:
+        # not processed: let Slack's retry of the event through
+        DEDUPLICATOR.forget(body)
+        raise
 
     return JSONResponse(content={}, status_code=200)
 
 
+@APP.get("/jobs/metrics")
+async def jobs_metrics() -> JSONResponse:
+    return JSONResponse(content=asdict(JOB_QUEUE.metrics), status_code=200)
+
+
 @APP.post("/event/feedback")
 async def slack_event_feedback(request: Request) -> JSONResponse:
 
@@ -0,0 +1,410 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Iterable, Iterator, Optional
+
+from llm_agents.dags._base import (
+    AgentBase,
+    AgentDAG,
+    AgentDAGStopException,
+    AgentInputValidationError,
+    AgentIO,
+)
+from llm_agents.dags.checkpoint import SQLiteCheckpointStore, checkpoint_run_id
+from llm_agents.dags.memo import NodeMemo
+from llm_agents.interfaces.bots._base import (
+    PROGRESS_TEXT_DEFAULT,
+    Bot,
+    build_header_generator,
+    get_header_done,
+    get_header_error,
+    get_header_timeout,
+)
+from llm_agents.interfaces.bots.outbox import get_outbox
+from llm_agents.interfaces.bots.progress import get_progress_ticker
+from llm_agents.interfaces.llms.limiter import Priority, priority_scope
+from llm_agents.interfaces.llms.scheduler import RetryPolicy
+from llm_agents.utils.deadline import (
+    Deadline,
+    DeadlineExceededError,
+    current_deadline,
+    deadline_scope,
+    earliest,
+    enforce_deadline,
+    is_deadline_exceeded,
+)
+
+MAX_CONCURRENCY_DEFAULT = 4
+# errors raised on purpose by agents: retrying would fail the same way
+NODE_NON_RETRYABLE_ERRORS = (AgentDAGStopException, AgentInputValidationError)
+
+
+class DAGDefinitionError(Exception): ...
+
+
+class DAGCycleError(DAGDefinitionError):
+    def __init__(self, nodes: Iterable[str]):
+        self.nodes = sorted(nodes)
+        super().__init__(f"The DAG has a cycle between nodes: {self.nodes}")
+
+
+class DAGNodeError(Exception):
+    """A node of the DAG failed. The original error is the `__cause__`."""
+
+    def __init__(self, node: str, error: BaseException):
+        self.node = node
+        self.error = error
+        super().__init__(f"DAG node '{node}' failed: {error!r}")
+
+
+@dataclass
+class DAGNode:
+    """An agent of the DAG and the nodes it needs the outputs of.
+
+    - `agent_kwargs` are given to the agent's constructor (prompts, llm...),
+    - `execute_kwargs` to its `execute`.
+    `memoize=False` opts the node out of the engine's memo. With a `retry`
+    policy, a failing agent is run again (with a new agent) up to
+    `retry.max_retries` times before the node fails. With a `timeout_sec`,
+    each attempt is cancelled after that many seconds (and within the run's
+    deadline in any case). The LLM calls of the agent are made with
+    `priority` (by default, the agent's `PRIORITY`).
+    Agents read their inputs from and write their outputs to `AgentIO.data`.
+    """
+
+    name: str
+    agent_class: type[AgentBase]
+    depends_on: tuple[str, ...] = ()
+    progress_message: Optional[str] = None
+    agent_kwargs: dict[str, Any] = field(default_factory=dict)
+    execute_kwargs: dict[str, Any] = field(default_factory=dict)
+    memoize: bool = True
+    retry: Optional[RetryPolicy] = None
+    timeout_sec: Optional[float] = None
+    priority: Optional[Priority] = None
+
+    def build_agent(
+        self, agent_io: AgentIO, bot: Bot, task_num: int, task_total: int
+    ) -> AgentBase:
+        return self.agent_class(
+            task_tag=self.name,
+            agent_io=agent_io,
+            bot=bot,
+            task_num=task_num,
+            task_total=task_total,
+            task_progress_message=self.progress_message,
+            **self.agent_kwargs,
+        )
+
+
+def topological_order(nodes: Iterable[DAGNode]) -> list[str]:
+    """Order the nodes so each one comes after its dependencies (Kahn's
+    algorithm). Raises DAGDefinitionError on duplicate or unknown nodes and
+    DAGCycleError if there is a cycle."""
+    nodes_by_name: dict[str, DAGNode] = {}
+    for node in nodes:
+        if node.name in nodes_by_name:
+            raise DAGDefinitionError(f"Duplicate DAG node '{node.name}'")
+        nodes_by_name[node.name] = node
+
+    nb_missing = {name: len(node.depends_on) for name, node in nodes_by_name.items()}
+    dependents: dict[str, list[str]] = {name: [] for name in nodes_by_name}
+    for node in nodes_by_name.values():
+        for dependency in node.depends_on:
+            if dependency not in nodes_by_name:
+                raise DAGDefinitionError(
+                    f"DAG node '{node.name}' depends on unknown node '{dependency}'"
+                )
+            dependents[dependency].append(node.name)
+
+    ready = deque(name for name, nb in nb_missing.items() if nb == 0)
+    order: list[str] = []
+    while ready:
+        name = ready.popleft()
+        order.append(name)
+        for dependent in dependents[name]:
+            nb_missing[dependent] -= 1
+            if nb_missing[dependent] == 0:
+                ready.append(dependent)
+    if len(order) < len(nodes_by_name):
+        raise DAGCycleError(name for name, nb in nb_missing.items() if nb > 0)
+    return order
+
+
+class DAGEngine:
+    """Run the agents of a DAG, each as soon as its dependencies are done.
+
+    The DAG is validated once, at creation. Independent branches run
+    concurrently, at most `max_concurrency` agents at a time, so a run takes
+    the time of its critical path. All the agents share the run's AgentIO:
+    outputs are passed through `AgentIO.data`. If a node fails, the running
+    nodes are cancelled, the progress message shows an error and a
+    DAGNodeError is raised.
+
+    A run must be done within `timeout_sec` (if given) and before the
+    `AgentIO.deadline`, which agents and clients read as their current
+    deadline: past it, the running nodes are cancelled, the progress message
+    says so and DeadlineExceededError is raised.
+
+    With `show_progress`, a single message shows the running nodes and the
+    number of nodes done, animated by the bot's progress ticker.
+
+    With a `memo`, the results of memoizable agents are reused: such a node
+    is skipped when the same inputs were already computed.
+
+    With `checkpoints`, the run is saved after each node under its run ID
+    (by default, one per user message) and a run with a checkpoint resumes
+    after its last successful nodes instead of starting over. The checkpoint
+    is deleted once the run succeeds.
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[DAGNode],
+        max_concurrency: int = MAX_CONCURRENCY_DEFAULT,
+        show_progress: bool = True,
+        memo: Optional[NodeMemo] = None,
+        checkpoints: Optional[SQLiteCheckpointStore] = None,
+        timeout_sec: Optional[float] = None,
+    ):
+        nodes = list(nodes)
+        self.order = topological_order(nodes)  # before duplicates are merged
+        self.nodes = {node.name: node for node in nodes}
+        self.max_concurrency = max_concurrency
+        self.show_progress = show_progress
+        self.memo = memo
+        self.checkpoints = checkpoints
+        self.timeout_sec = timeout_sec
+
+    async def run(
+        self, agent_io: AgentIO, run_id: Optional[str] = None, resume: bool = True
+    ) -> AgentIO:
+        """Run the DAG. With checkpoints and `resume`, the nodes done by a
+        previous attempt of the same run are not run again."""
+        if run_id is None:
+            run_id = checkpoint_run_id(agent_io.user_input)
+        dag_run = _DAGRun(self, agent_io, run_id)
+        if resume and self.checkpoints is not None:
+            checkpoint = self.checkpoints.load(run_id)
+            if checkpoint is not None:
+                dag_run.restore(checkpoint.agent_io, checkpoint.done_nodes)
+        return await dag_run.run()
+
+    async def resume(self, run_id: str, bot: Bot) -> AgentIO:
+        """Resume a run from its checkpoint alone (e.g. from another process).
+        Raises KeyError if the run has no checkpoint."""
+        if self.checkpoints is None:
+            raise KeyError(run_id)
+        checkpoint = self.checkpoints.load(run_id)
+        if checkpoint is None:
+            raise KeyError(run_id)
+        agent_io = AgentIO.from_json(checkpoint.agent_io, bot)
+        dag_run = _DAGRun(self, agent_io, run_id)
+        dag_run.restore(None, checkpoint.done_nodes)
+        return await dag_run.run()
+
+
+class _DAGRun:
+    """State of one run of a DAGEngine."""
+
+    def __init__(self, engine: DAGEngine, agent_io: AgentIO, run_id: str):
+        self.engine = engine
+        self.agent_io = agent_io
+        self.run_id = run_id
+        agent_io.deadline = earliest(
+            agent_io.deadline,
+            current_deadline(),
+            None if engine.timeout_sec is None else Deadline.after(engine.timeout_sec),
+        )
+        self.bot = agent_io.bot
+        self.semaphore = asyncio.Semaphore(engine.max_concurrency)
+        self.done: set[str] = set()
+        self.running: dict[str, asyncio.Task[AgentIO]] = {}
+
+    def restore(
+        self, agent_io_json: Optional[dict[str, Any]], done_nodes: Iterable[str]
+    ) -> None:
+        """Start from a checkpoint: its nodes are done and, if given, its
+        AgentIO state is loaded into the run's one."""
+        if agent_io_json is not None:
+            self.agent_io.data.update(agent_io_json.get("data") or {})
+            self.agent_io.processing_time = agent_io_json.get("processing_time", 0)
+            context = agent_io_json.get("context") or {}
+            if self.agent_io.context.message_id is None:
+                # keep answering in the message of the previous attempt
+                self.agent_io.context.message_id = context.get("message_id")
+        self.done.update(name for name in done_nodes if name in self.engine.nodes)
+
+    def _is_ready(self, name: str) -> bool:
+        return all(d in self.done for d in self.engine.nodes[name].depends_on)
+
+    async def _run_node(self, name: str) -> AgentIO:
+        node = self.engine.nodes[name]
+        attempt = 0
+        run_deadline = self.agent_io.deadline
+        priority = node.agent_class.PRIORITY if node.priority is None else node.priority
+        while True:
+            try:
+                async with self.semaphore:
+                    deadline = earliest(
+                        run_deadline,
+                        (
+                            None
+                            if node.timeout_sec is None
+                            else Deadline.after(node.timeout_sec)
+                        ),
+                    )
+                    with deadline_scope(deadline), priority_scope(priority):
+                        async with enforce_deadline(deadline):
+                            return await self._execute_node(node)
+            except NODE_NON_RETRYABLE_ERRORS:
+                raise
+            except Exception:  # pylint: disable=broad-exception-caught
+                if node.retry is None or attempt >= node.retry.max_retries:
+                    raise
+                if run_deadline is not None and run_deadline.expired:
+                    raise
+            # the backoff does not hold a concurrency slot
+            await asyncio.sleep(node.retry.compute_delay(attempt))
+            attempt += 1
+
+    async def _execute_node(self, node: DAGNode) -> AgentIO:
+        agent = node.build_agent(
+            self.agent_io,
+            self.bot,
+            task_num=self.engine.order.index(node.name) + 1,
+            task_total=len(self.engine.order),
+        )
+        memo = self.engine.memo if node.memoize else None
+        key = None if memo is None else memo.key(agent, node.execute_kwargs)
+        if memo is not None and key is not None:
+            outputs = memo.get(key)
+            if outputs is not None:
+                self.agent_io.data.update(outputs)
+                return self.agent_io
+        output = await agent.execute(**node.execute_kwargs)
+        if memo is not None and key is not None:
+            memo.set(key, agent, output)
+        return output
+
+    def _start_ready_nodes(self) -> None:
+        for name in self.engine.order:
+            if name not in self.done and name not in self.running:
+                if self._is_ready(name):
+                    self.running[name] = asyncio.create_task(self._run_node(name))
+
+    def _progress_headers(self) -> Iterator[str]:
+        """Header frames listing the running nodes, updated on each frame."""
+        state: Optional[tuple[str, int]] = None
+        headers: Iterator[str] = iter(())
+        while True:
+            running = [
+                self.engine.nodes[name].progress_message or PROGRESS_TEXT_DEFAULT
+                for name in self.running
+            ]
+            text = ", ".join(dict.fromkeys(running)) or PROGRESS_TEXT_DEFAULT
+            if (text, len(self.done)) != state:
+                state = (text, len(self.done))
+                headers = build_header_generator(
+                    text, len(self.done), len(self.engine.order)
+                )
+            yield next(headers)
+
+    async def run(self) -> AgentIO:
+        context = self.agent_io.context
+        outbox = get_outbox(self.bot)
+        ticker = get_progress_ticker(self.bot)
+        start_time = time.monotonic()
+        self._start_ready_nodes()
+        if self.engine.show_progress:
+            context.flush()
+            headers = self._progress_headers()
+            context.header = next(headers)
+            await outbox.send(context)
+            ticker.register(context, headers)
+        deadline = self.agent_io.deadline
+        failure: Optional[Exception] = None
+        try:
+            while self.running:
+                finished, _ = await asyncio.wait(
+                    self.running.values(),
+                    timeout=None if deadline is None else deadline.remaining(),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not finished:
+                    raise DeadlineExceededError("DAG run exceeded its deadline")
+                for name, task in list(self.running.items()):
+                    if task not in finished:
+                        continue
+                    del self.running[name]
+                    error = task.exception()
+                    if error is not None:
+                        raise DAGNodeError(name, error) from error
+                    self._merge(task.result())
+                    self.done.add(name)
+                    self._checkpoint()
+                self._start_ready_nodes()
+        except Exception as e:
+            failure = e
+            raise
+        finally:
+            for task in self.running.values():
+                task.cancel()
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+            self.agent_io.processing_time += time.monotonic() - start_time
+            if self.engine.show_progress:
+                ticker.deregister(context)
+                if failure is not None and context.message_id is not None:
+                    if is_deadline_exceeded(failure):
+                        context.header = get_header_timeout(
+                            self.agent_io.processing_time
+                        )
+                        self.agent_io.timeout_notified = True
+                    else:
+                        context.header = get_header_error(self.agent_io.processing_time)
+                    outbox.submit(context)
+        if self.engine.checkpoints is not None:
+            self.engine.checkpoints.delete(self.run_id)
+        if self.engine.show_progress:
+            context.header = get_header_done(self.agent_io.processing_time)
+            await outbox.send(context)
+        return self.agent_io
+
+    def _checkpoint(self) -> None:
+        if self.engine.checkpoints is not None:
+            self.engine.checkpoints.save(self.run_id, self.agent_io, self.done)
+
+    def _merge(self, output: AgentIO) -> None:
+        if output is not self.agent_io:
+            self.agent_io.data.update(output.data)
+
+
+class DeclarativeAgentDAG(AgentDAG):
+    """An AgentDAG described by its nodes and run by a DAGEngine.
+
+    Subclasses only declare `NODES` (and optionally `MAX_CONCURRENCY` and
+    `TIMEOUT_SEC`).
+    """
+
+    NODES: ClassVar[list[DAGNode]]
+    MAX_CONCURRENCY: ClassVar[int] = MAX_CONCURRENCY_DEFAULT
+    TIMEOUT_SEC: ClassVar[Optional[float]] = None
+
+    def __init__(
+        self,
+        bot: Bot,
+        memo: Optional[NodeMemo] = None,
+        checkpoints: Optional[SQLiteCheckpointStore] = None,
+    ):
+        super().__init__(bot)
+        self.engine = DAGEngine(
+            self.NODES,
+            max_concurrency=self.MAX_CONCURRENCY,
+            memo=memo,
+            checkpoints=checkpoints,
+            timeout_sec=self.TIMEOUT_SEC,
+        )
+
+    async def execute(self, agent_io: AgentIO) -> AgentIO:
+        return await self.engine.run(agent_io)
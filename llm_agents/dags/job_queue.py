@@ -0,0 +1,309 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from llm_agents.dags._base import AgentDAG, AgentIO
+from llm_agents.dags.job_store import JobStatus, SQLiteJobStore
+from llm_agents.interfaces.bots._base import UserInput, style_error_message
+from llm_agents.interfaces.bots.outbox import get_outbox
+from llm_agents.utils.deadline import (
+    Deadline,
+    enforce_deadline,
+    is_deadline_exceeded,
+)
+from llm_agents.utils.fair_queue import FairQueue
+
+NB_WORKERS_DEFAULT = 8
+MAX_QUEUE_DEPTH_DEFAULT = 100
+DRAIN_TIMEOUT_SEC_DEFAULT = 30.0
+RUN_TIMEOUT_SEC_DEFAULT = 300.0
+# time left to a run past its deadline to stop (and tell the user) by itself
+RUN_TIMEOUT_GRACE_SEC = 1.0
+# at most one busy reply per channel in this interval
+BUSY_REPLY_INTERVAL_SEC_DEFAULT = 10.0
+BUSY_MESSAGE = style_error_message(
+    "Je reçois beaucoup de demandes en ce moment, "
+    "merci de réessayer dans quelques instants."
+)
+TIMEOUT_MESSAGE = style_error_message(
+    "Ta demande a pris trop de temps et a été interrompue, "
+    "merci de réessayer ou de la reformuler."
+)
+
+
+@dataclass
+class JobQueueMetrics:
+    queue_depth: int = 0
+    queue_depth_by_workspace: dict[str, int] = field(default_factory=dict)
+    in_flight: int = 0
+    nb_submitted: int = 0
+    nb_completed: int = 0
+    nb_failed: int = 0
+    nb_shed: int = 0
+    nb_busy_replies_skipped: int = 0
+    nb_timed_out: int = 0
+    nb_recovered: int = 0
+    total_wait_sec: float = 0.0
+    max_wait_sec: float = 0.0
+
+    @property
+    def mean_wait_sec(self) -> float:
+        nb_started = self.nb_completed + self.nb_failed + self.in_flight
+        return self.total_wait_sec / nb_started if nb_started else 0.0
+
+
+class DAGJobQueue:
+    """Run a DAG on incoming events with a bounded pool of async workers.
+
+    Runs wait in a `FairQueue` keyed by workspace, so a busy workspace cannot
+    starve the others, and `nb_workers` of them execute at a time. When
+    `max_queue_depth` runs are already waiting, new ones are shed: the user
+    gets `busy_message` in their thread instead, at most once per channel
+    every `busy_reply_interval_sec` so a burst does not turn into a burst of
+    replies. Replies go through the bot's outbox, paced per channel.
+    `stop` lets the workers drain the queue before shutting down.
+
+    Each run gets `run_timeout_sec` from the moment a worker takes it (its
+    `AgentIO.deadline`, unless it already has one): past it, the run is
+    cancelled so it cannot hold the worker, it is not retried and the user
+    gets `timeout_message`, unless the run already told them (see
+    `AgentIO.timeout_notified`).
+
+    With a `store`, runs are persisted before being queued and leased while
+    they execute: on `start`, the runs left unfinished by a previous process
+    (or whose worker died) are queued again, and failed runs are retried up
+    to the store's `max_attempts`. If the DAG's engine has checkpoints, a
+    retried run resumes after its last successful node. A retried run
+    answers in the message of its previous attempt, which the store keeps.
+    """
+
+    def __init__(
+        self,
+        dag: AgentDAG,
+        nb_workers: int = NB_WORKERS_DEFAULT,
+        max_queue_depth: int = MAX_QUEUE_DEPTH_DEFAULT,
+        busy_message: str = BUSY_MESSAGE,
+        busy_reply_interval_sec: float = BUSY_REPLY_INTERVAL_SEC_DEFAULT,
+        store: Optional[SQLiteJobStore] = None,
+        run_timeout_sec: Optional[float] = RUN_TIMEOUT_SEC_DEFAULT,
+        timeout_message: str = TIMEOUT_MESSAGE,
+    ):
+        self.dag = dag
+        self.store = store
+        self.nb_workers = nb_workers
+        self.max_queue_depth = max_queue_depth
+        self.busy_message = busy_message
+        self.busy_reply_interval_sec = busy_reply_interval_sec
+        self.run_timeout_sec = run_timeout_sec
+        self.timeout_message = timeout_message
+        self.last_error: Optional[Exception] = None
+        # (run, time it was queued, ID of its job in the store)
+        self._queue: FairQueue[tuple[AgentIO, float, Optional[int]]] = FairQueue()
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task[None]] = []
+        self._reaper: Optional[asyncio.Task[None]] = None
+        self._replies: set[asyncio.Task[None]] = set()
+        # channel -> time of its last busy reply
+        self._busy_replied_at: dict[str, float] = {}
+        self._closing = False
+        self._in_flight = 0
+        self._nb_submitted = 0
+        self._nb_completed = 0
+        self._nb_failed = 0
+        self._nb_shed = 0
+        self._nb_busy_replies_skipped = 0
+        self._nb_timed_out = 0
+        self._nb_recovered = 0
+        self._total_wait_sec = 0.0
+        self._max_wait_sec = 0.0
+
+    @property
+    def metrics(self) -> JobQueueMetrics:
+        return JobQueueMetrics(
+            queue_depth=len(self._queue),
+            queue_depth_by_workspace={
+                str(key): size for key, size in self._queue.qsize_by_key().items()
+            },
+            in_flight=self._in_flight,
+            nb_submitted=self._nb_submitted,
+            nb_completed=self._nb_completed,
+            nb_failed=self._nb_failed,
+            nb_shed=self._nb_shed,
+            nb_busy_replies_skipped=self._nb_busy_replies_skipped,
+            nb_timed_out=self._nb_timed_out,
+            nb_recovered=self._nb_recovered,
+            total_wait_sec=self._total_wait_sec,
+            max_wait_sec=self._max_wait_sec,
+        )
+
+    def start(self) -> None:
+        """Start the workers (from a running event loop), after queueing the
+        runs to resume from the store."""
+        self._closing = False
+        if self.store is not None:
+            self._recover()
+            self._reaper = asyncio.create_task(self._reap())
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self.nb_workers)
+        ]
+
+    def submit(self, agent_io: AgentIO) -> bool:
+        """Queue a DAG run. Returns False if it was shed (queue too deep or
+        shutting down), in which case the user is told to retry later."""
+        if self._closing or len(self._queue) >= self.max_queue_depth:
+            self._nb_shed += 1
+            self._reply_busy(agent_io)
+            return False
+        job_id = None if self.store is None else self.store.add(agent_io.user_input)
+        self._put(agent_io, job_id)
+        self._nb_submitted += 1
+        return True
+
+    def _put(self, agent_io: AgentIO, job_id: Optional[int]) -> None:
+        self._queue.put(
+            (agent_io, time.monotonic(), job_id),
+            key=agent_io.user_input.workspace_id,
+        )
+        self._wakeup.set()
+
+    def _recover(self) -> None:
+        assert self.store is not None
+        queued = {job_id for _, _, job_id in self._queue}
+        for job in self.store.recover():
+            if job.job_id not in queued:
+                agent_io = self._build_agent_io(job.user_input, job.message_id)
+                self._put(agent_io, job.job_id)
+                self._nb_recovered += 1
+
+    def _build_agent_io(
+        self, user_input: UserInput, message_id: Optional[str]
+    ) -> AgentIO:
+        """AgentIO of a retried run, updating the message of the previous
+        attempt (if it posted one) instead of posting a new one."""
+        agent_io = self.dag.build_agent_io(user_input)
+        if message_id is not None:
+            agent_io.context.message_id = message_id
+        return agent_io
+
+    async def stop(self, timeout: Optional[float] = DRAIN_TIMEOUT_SEC_DEFAULT) -> None:
+        """Stop accepting runs, let the workers finish the queued ones, then
+        stop them. Runs still going after `timeout` seconds are cancelled."""
+        self._closing = True
+        self._wakeup.set()
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        _, pending = await asyncio.wait(
+            self._workers + list(self._replies), timeout=timeout
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._workers = []
+
+    def _reply_busy(self, agent_io: AgentIO) -> None:
+        now = time.monotonic()
+        self._busy_replied_at = {
+            channel_id: replied_at
+            for channel_id, replied_at in self._busy_replied_at.items()
+            if now - replied_at < self.busy_reply_interval_sec
+        }
+        channel_id = agent_io.context.channel_id
+        if channel_id in self._busy_replied_at:
+            self._nb_busy_replies_skipped += 1
+            return
+        self._busy_replied_at[channel_id] = now
+        self._reply(agent_io, self.busy_message)
+
+    def _reply(self, agent_io: AgentIO, message: str) -> None:
+        """Answer the user in a new message of their thread, in background."""
+        reply = asyncio.create_task(self._send_reply(agent_io, message))
+        self._replies.add(reply)
+        reply.add_done_callback(self._replies.discard)
+
+    async def _send_reply(self, agent_io: AgentIO, message: str) -> None:
+        context = agent_io.context.new_message()
+        context.body = message
+        try:
+            await get_outbox(self.dag.bot).send(context)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.last_error = e
+
+    async def _work(self) -> None:
+        while True:
+            if not len(self._queue):
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            agent_io, queued_at, job_id = self._queue.pop()
+            if self.store is not None and job_id is not None:
+                if not self.store.lease(job_id):
+                    continue  # done meanwhile, or run by another process
+            wait_sec = time.monotonic() - queued_at
+            self._total_wait_sec += wait_sec
+            self._max_wait_sec = max(self._max_wait_sec, wait_sec)
+            if agent_io.deadline is None and self.run_timeout_sec is not None:
+                agent_io.deadline = Deadline.after(self.run_timeout_sec)
+            self._in_flight += 1
+            try:
+                await self._execute(agent_io, job_id)
+            finally:
+                self._in_flight -= 1
+
+    async def _execute(self, agent_io: AgentIO, job_id: Optional[int]) -> None:
+        heartbeat = None
+        if self.store is not None and job_id is not None:
+            heartbeat = asyncio.create_task(self._renew_lease(job_id, agent_io))
+        try:
+            # the DAG should stop at the deadline: this is the hard stop
+            hard_deadline = None
+            if agent_io.deadline is not None:
+                hard_deadline = Deadline(
+                    agent_io.deadline.expires_at + RUN_TIMEOUT_GRACE_SEC
+                )
+            async with enforce_deadline(hard_deadline):
+                await self.dag.execute(agent_io)
+        except asyncio.CancelledError:
+            if self.store is not None and job_id is not None:
+                # resumed by the next process
+                self.store.release(job_id, agent_io.context.message_id)
+            raise
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._nb_failed += 1
+            self.last_error = e
+            if is_deadline_exceeded(e):
+                self._nb_timed_out += 1
+                if not agent_io.timeout_notified:
+                    self._reply(agent_io, self.timeout_message)
+                if self.store is not None and job_id is not None:
+                    self.store.fail(job_id, repr(e))
+            elif self.store is not None and job_id is not None:
+                message_id = agent_io.context.message_id
+                status = self.store.nack(job_id, repr(e), message_id)
+                if status == JobStatus.PENDING and not self._closing:
+                    retry = self._build_agent_io(agent_io.user_input, message_id)
+                    self._put(retry, job_id)
+        else:
+            self._nb_completed += 1
+            if self.store is not None and job_id is not None:
+                self.store.ack(job_id)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+
+    async def _renew_lease(self, job_id: int, agent_io: AgentIO) -> None:
+        assert self.store is not None
+        while True:
+            await asyncio.sleep(self.store.lease_sec / 3)
+            # if this process dies, the next attempt updates the message
+            self.store.renew(job_id, agent_io.context.message_id)
+
+    async def _reap(self) -> None:
+        """Queue again the jobs whose worker died (lease expired)."""
+        assert self.store is not None
+        while True:
+            await asyncio.sleep(self.store.lease_sec)
+            self._recover()
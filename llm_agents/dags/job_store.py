@@ -0,0 +1,251 @@
+import json
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Optional, Union
+
+from llm_agents.interfaces.bots._base import UserInput
+
+LEASE_SEC_DEFAULT = 60.0
+MAX_ATTEMPTS_DEFAULT = 3
+DONE_JOBS_TTL_SEC_DEFAULT = 24 * 3600
+EXHAUSTED_ERROR = "Interrupted on each of its attempts (e.g. its process died)"
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    job_id: int
+    user_input: UserInput
+    status: JobStatus = JobStatus.PENDING
+    attempts: int = 0
+    error: Optional[str] = None
+    message_id: Optional[str] = None  # progress message of the last attempt
+
+
+class SQLiteJobStore:
+    """Durable queue of DAG runs, in a SQLite database in WAL mode.
+
+    A job is `lease`d by the worker running it for `lease_sec` seconds,
+    `renew`ed while it runs, then `ack`ed (done) or `nack`ed (retried until
+    `max_attempts`). Jobs whose lease expired, because their process died,
+    are handed out again by `recover`, also until `max_attempts`: a job
+    crashing its process is not retried forever.
+
+    The ID of the message answering the user is saved when the lease is
+    renewed or given back, so that another attempt updates it instead of
+    leaving it stuck and posting a new one.
+    """
+
+    _COLUMNS = "job_id, user_input, status, attempts, error, message_id"
+
+    def __init__(
+        self,
+        path: Union[str, Path] = ":memory:",
+        lease_sec: float = LEASE_SEC_DEFAULT,
+        max_attempts: int = MAX_ATTEMPTS_DEFAULT,
+        done_jobs_ttl_sec: float = DONE_JOBS_TTL_SEC_DEFAULT,
+    ):
+        self.lease_sec = lease_sec
+        self.max_attempts = max_attempts
+        self.done_jobs_ttl_sec = done_jobs_ttl_sec
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_input TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_until REAL NOT NULL DEFAULT 0,
+                error TEXT,
+                message_id TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, lease_until);
+            """)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")}
+        if "message_id" not in columns:  # created by an older version
+            self.connection.execute("ALTER TABLE jobs ADD COLUMN message_id TEXT")
+        self.connection.commit()
+
+    def add(self, user_input: UserInput) -> int:
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO jobs (user_input, status, updated_at) VALUES (?, ?, ?)",
+                (json.dumps(asdict(user_input)), JobStatus.PENDING.value, time.time()),
+            )
+        assert cursor.lastrowid is not None
+        return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[Job]:
+        row = self.connection.execute(
+            f"SELECT {self._COLUMNS} FROM jobs WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        return None if row is None else self._to_job(row)
+
+    def lease(self, job_id: int) -> bool:
+        """Take the job, unless it is done, leased by a live worker or out of
+        attempts (it is then marked as failed)."""
+        now = time.time()
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = ? AND attempts < ? "
+                "AND (status = ? OR (status = ? AND lease_until < ?))",
+                (
+                    JobStatus.RUNNING.value,
+                    now + self.lease_sec,
+                    now,
+                    job_id,
+                    self.max_attempts,
+                    JobStatus.PENDING.value,
+                    JobStatus.RUNNING.value,
+                    now,
+                ),
+            )
+            if cursor.rowcount == 0:
+                self._fail_exhausted(now, job_id)
+        return cursor.rowcount > 0
+
+    def renew(self, job_id: int, message_id: Optional[str] = None) -> None:
+        now = time.time()
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ?, "
+                "message_id = COALESCE(?, message_id) "
+                "WHERE job_id = ? AND status = ?",
+                (
+                    now + self.lease_sec,
+                    now,
+                    message_id,
+                    job_id,
+                    JobStatus.RUNNING.value,
+                ),
+            )
+
+    def ack(self, job_id: int) -> None:
+        self._set_status(job_id, JobStatus.DONE)
+
+    def nack(
+        self,
+        job_id: int,
+        error: Optional[str] = None,
+        message_id: Optional[str] = None,
+    ) -> JobStatus:
+        """Mark a run as failed. The job goes back to pending until it has
+        been attempted `max_attempts` times. Returns its new status."""
+        job = self.get(job_id)
+        status = (
+            JobStatus.PENDING
+            if job is not None and job.attempts < self.max_attempts
+            else JobStatus.FAILED
+        )
+        self._set_status(job_id, status, error, message_id)
+        return status
+
+    def fail(self, job_id: int, error: Optional[str] = None) -> None:
+        """Mark a run as failed for good, whatever its attempts."""
+        self._set_status(job_id, JobStatus.FAILED, error)
+
+    def release(self, job_id: int, message_id: Optional[str] = None) -> None:
+        """Give the job back without counting the attempt (e.g. shutdown)."""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, lease_until = 0, "
+                "attempts = MAX(attempts - 1, 0), updated_at = ?, "
+                "message_id = COALESCE(?, message_id) "
+                "WHERE job_id = ? AND status = ?",
+                (
+                    JobStatus.PENDING.value,
+                    time.time(),
+                    message_id,
+                    job_id,
+                    JobStatus.RUNNING.value,
+                ),
+            )
+
+    def recover(self) -> list[Job]:
+        """Jobs to (re)run: pending ones and those whose lease expired."""
+        now = time.time()
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (
+                    JobStatus.DONE.value,
+                    JobStatus.FAILED.value,
+                    now - self.done_jobs_ttl_sec,
+                ),
+            )
+            self._fail_exhausted(now)
+        rows = self.connection.execute(
+            f"SELECT {self._COLUMNS} FROM jobs "
+            "WHERE status = ? OR (status = ? AND lease_until < ?) ORDER BY job_id",
+            (JobStatus.PENDING.value, JobStatus.RUNNING.value, now),
+        ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _fail_exhausted(self, now: float, job_id: Optional[int] = None) -> None:
+        """Mark as failed the available jobs (or this one) which were already
+        attempted `max_attempts` times. Must be called in a transaction."""
+        query = (
+            "UPDATE jobs SET status = ?, lease_until = 0, "
+            "error = COALESCE(error, ?), updated_at = ? "
+            "WHERE attempts >= ? AND (status = ? OR (status = ? AND lease_until < ?))"
+        )
+        params: tuple[Union[str, float, int], ...] = (
+            JobStatus.FAILED.value,
+            EXHAUSTED_ERROR,
+            now,
+            self.max_attempts,
+            JobStatus.PENDING.value,
+            JobStatus.RUNNING.value,
+            now,
+        )
+        if job_id is not None:
+            query += " AND job_id = ?"
+            params += (job_id,)
+        self.connection.execute(query, params)
+
+    def _set_status(
+        self,
+        job_id: int,
+        status: JobStatus,
+        error: Optional[str] = None,
+        message_id: Optional[str] = None,
+    ) -> None:
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, lease_until = 0, error = ?, "
+                "message_id = COALESCE(?, message_id), updated_at = ? "
+                "WHERE job_id = ?",
+                (status.value, error, message_id, time.time(), job_id),
+            )
+
+    @staticmethod
+    def _to_job(
+        row: tuple[int, str, str, int, Optional[str], Optional[str]],
+    ) -> Job:
+        job_id, user_input, status, attempts, error, message_id = row
+        return Job(
+            job_id=job_id,
+            user_input=UserInput(**json.loads(user_input)),
+            status=JobStatus(status),
+            attempts=attempts,
+            error=error,
+            message_id=message_id,
+        )
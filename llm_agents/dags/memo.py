@@ -0,0 +1,93 @@
+import hashlib
+import json
+from enum import Enum
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from llm_agents.dags._base import AgentBase, AgentIO
+from llm_agents.interfaces.llms.cache import (
+    CACHE_TTL_SEC_DEFAULT,
+    CacheStats,
+    ResponseCache,
+    payload_fingerprint,
+)
+
+MEMO_MAX_MEMORY_ENTRIES_DEFAULT = 1_024
+
+
+def prompt_fingerprint(agent: AgentBase) -> str:
+    """Hash of the agent's system prompt and model."""
+    model = getattr(agent.llm, "model", None)
+    text = "\n".join(
+        [
+            agent.system_prompt(),
+            str(model.value if isinstance(model, Enum) else model),
+        ]
+    )
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class NodeMemo:
+    """Results of memoizable DAG nodes (see `AgentBase.MEMO_INPUT_KEYS`).
+
+    A result is keyed on the agent class, its prompt fingerprint, the user
+    message, the `execute` kwargs and the `MEMO_INPUT_KEYS` slice of
+    `AgentIO.data`. It holds the `MEMO_OUTPUT_KEYS` slice written by the
+    agent, which must be JSON serializable (results which are not are not
+    memoized). Storage is a `ResponseCache`: LRU in memory, plus a SQLite
+    file if `path` is given.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        max_memory_entries: int = MEMO_MAX_MEMORY_ENTRIES_DEFAULT,
+        ttl_sec: float = CACHE_TTL_SEC_DEFAULT,
+    ):
+        self.cache = ResponseCache(
+            path=path, max_memory_entries=max_memory_entries, ttl_sec=ttl_sec
+        )
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.cache.stats
+
+    def key(
+        self, agent: AgentBase, execute_kwargs: Optional[dict[str, Any]] = None
+    ) -> Optional[str]:
+        """Key of the agent's result, None if it cannot be memoized."""
+        input_keys = type(agent).MEMO_INPUT_KEYS
+        if input_keys is None:
+            return None
+        data = agent.agent_io.data
+        try:
+            return payload_fingerprint(
+                {
+                    "agent": f"{type(agent).__module__}.{type(agent).__qualname__}",
+                    "prompt": prompt_fingerprint(agent),
+                    "message": agent.agent_io.user_input.message,
+                    "kwargs": execute_kwargs or {},
+                    "inputs": {key: data.get(key) for key in input_keys},
+                }
+            )
+        except (TypeError, ValueError):  # inputs not JSON serializable
+            return None
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        value = self.cache.get(key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, agent: AgentBase, agent_io: AgentIO) -> None:
+        outputs = {
+            k: agent_io.data[k]
+            for k in type(agent).MEMO_OUTPUT_KEYS
+            if k in agent_io.data
+        }
+        try:
+            value = json.dumps(outputs, ensure_ascii=False)
+        except (TypeError, ValueError):  # e.g. circular references
+            return
+        self.cache.set(key, value)
+
+    def close(self) -> None:
+        self.cache.close()
@@ -0,0 +1,12 @@
+from ._base import Bot, BotRateLimitedError, MessageContext, UserInput
+from .dedup import (
+    EventDeduplicator,
+    InMemorySeenEventStore,
+    SeenEventStore,
+    SQLiteSeenEventStore,
+)
+from .identity import BotIdentityCache
+from .outbox import MessageOutbox, OutboxStats, get_outbox
+from .progress import ProgressTicker, get_progress_ticker
+from .slack import SlackBot, SlackEventsAPIInput
+from .streaming import StreamingMessage
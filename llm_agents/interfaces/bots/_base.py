@@ -19,7 +19,7 @@ class UserInput:
     message: str  # slack equivalent: event.text
     message_id: str = ""  # slack equivalent: event.ts
     user_id: str = ""  # slack equivalent: event.user
-    thread_id: str = ""  # slack equivalent: event.ts -> ID of the message
+    thread_id: str = ""  # slack equivalent: event.thread_ts, else event.ts
     channel_id: str = ""  # slack equivalent: event.channel
     app_id: str = ""  # slack equivalent: api_app_id
     workspace_id: str = ""  # slack equivalent: team_i
@@ -28,6 +28,40 @@ class UserInput:
     is_bot: bool = False  # is the message sent by the bot itself ?
 
 
+@dataclass
+class MessageContext:
+    """The bot message answering one conversation.
+
+    Each conversation (and each concurrent task) gets its own context, so
+    one bot instance can serve many threads at once. `message_id` is set
+    once the message has been posted; later sends update that message.
+    """
+
+    channel_id: str
+    thread_id: Optional[str] = None
+    message_id: Optional[str] = None
+    header: str = ""
+    body: str = ""
+
+    @classmethod
+    def from_user_input(cls, user_input: UserInput) -> "MessageContext":
+        return cls(channel_id=user_input.channel_id, thread_id=user_input.thread_id)
+
+    @property
+    def message(self) -> str:
+        """Message is a combination of header and body."""
+        return f"{self.header}\n{self.body}"
+
+    def flush(self):
+        """Set to empty strings the header and body of the message."""
+        self.header = ""
+        self.body = ""
+
+    def new_message(self) -> "MessageContext":
+        """Context for another message in the same channel and thread."""
+        return MessageContext(channel_id=self.channel_id, thread_id=self.thread_id)
+
+
 class MessageHeaderStyle(Enum):
     CODE_LINE = auto()
 
@@ -35,32 +69,38 @@ class MessageHeaderStyle(Enum):
 class UserInputProcessingError(Exception): ...
 
 
+class BotRateLimitedError(Exception):
+    """The platform refused a call: retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Rate limited, retry after {retry_after}s")
+
+
 class Bot(Protocol):
     def __init__(self, credentials: Optional[Dict[str, str]] = None):
         self.bot_token: str
         self.client: Any
         self.bot_id: str
-        self.current_header: str
-        self.current_body: str
-        self.current_bot_message_id: Optional[str]
-        self.current_bot_thread_id: Optional[str]
-        self.current_bot_channel_id: Optional[str]
-
-    @property
-    def current_message(self):
-        return f"{self.current_header}\n{self.current_body}"
-
-    def flush(self):
-        """Set to empty strings the header and body of the message."""
 
     def _get_bot_id(self) -> Optional[str]:
         """Get the bot user ID on the platform."""
         ...
 
+    async def start(self) -> str:
+        """Resolve what the bot needs before serving (e.g. its user ID)
+        without blocking the event loop. Returns the bot user ID."""
+        ...
+
     def is_message_from_bot(self, user_id: str) -> bool:
         """Check if the message received is from the bot."""
         ...
 
+    def is_ignored_event(self, body: Dict[str, Any]) -> bool:
+        """Check on the raw request body if the event can be dropped without
+        validating it (e.g. the bot's own messages)."""
+        ...
+
     def build_user_input(self, body: Dict[str, Any]) -> UserInput:
         """Validate the incoming request and transform it into a BotInput.
 
@@ -70,39 +110,29 @@ class Bot(Protocol):
         """
         ...
 
-    def send_message(
+    async def send_message(
         self,
-        channel_id: str,
-        thread_id: Optional[str] = None,
-        message_id: Optional[str] = None,
+        context: MessageContext,
         add_feedback_section: bool = False,
         text_in_block: bool = True,
-    ) -> str: ...
+    ) -> str:
+        """Post the context's message, or update it if it was already posted.
+        Sets and returns `context.message_id`."""
+        ...
 
-    def init_header(
+    def send_message_sync(
         self,
         channel_id: str,
         thread_id: Optional[str] = None,
         message_id: Optional[str] = None,
-        task_tag: str = PROGRESS_TEXT_DEFAULT,
-        task_num: Optional[int] = None,
-        task_total: Optional[int] = None,
-        emojis: Tuple[str, ...] = PROGRESS_EMOJIS,
-        nb_dots: Optional[int] = PROGRESS_NB_DOTS,
-    ) -> str: ...
-
-    def update_header(
-        self,
-        is_done: bool = False,
-        time_elapsed: float = 0,
-    ) -> str: ...
-
-    def update_task_info(
-        self,
-        task_tag: str,
-        task_num: int,
-        task_total: int,
-    ) -> None: ...
+        add_feedback_section: bool = False,
+        text_in_block: bool = True,
+        header: str = "",
+        body: str = "",
+    ) -> str:
+        """Blocking version of `send_message`, with the arguments of its former
+        synchronous version. Returns the message ID."""
+        ...
 
 
 def build_header_generator(
@@ -138,5 +168,19 @@ def get_header_done(time_elapsed: float = 0) -> str:
     return header
 
 
+def get_header_timeout(time_elapsed: float = 0) -> str:
+    header = "Temps de réponse dépassé, la demande a été interrompue."
+    if time_elapsed > 0:
+        header += f" (🕒 {time_elapsed:.1f} secondes)"
+    return style_error_message(f"`{header}`")
+
+
+def get_header_error(time_elapsed: float = 0) -> str:
+    header = "Une erreur est survenue, la demande a été interrompue."
+    if time_elapsed > 0:
+        header += f" (🕒 {time_elapsed:.1f} secondes)"
+    return style_error_message(f"`{header}`")
+
+
 def style_error_message(error_message: str):
     return f"{ERROR_EMOJI} {error_message}"
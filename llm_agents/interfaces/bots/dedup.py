@@ -0,0 +1,178 @@
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Mapping, Optional, Protocol, Union
+
+# Slack retries unacknowledged events 3 times, over ~5 minutes
+EVENT_TTL_SEC_DEFAULT = 3600
+MAX_EVENTS_DEFAULT = 100_000
+SLACK_RETRY_NUM_HEADER = "X-Slack-Retry-Num"
+
+
+class SeenEventStore(Protocol):
+    def add(self, event_id: str) -> bool:
+        """Record the event. Returns False if it was already recorded."""
+        ...
+
+    def discard(self, event_id: str) -> None:
+        """Forget the event, so it is processed if received again."""
+        ...
+
+    def clear(self) -> None: ...
+
+
+class InMemorySeenEventStore:
+    """Event IDs seen in the last `ttl_sec` seconds, at most `max_events`."""
+
+    def __init__(
+        self,
+        ttl_sec: float = EVENT_TTL_SEC_DEFAULT,
+        max_events: int = MAX_EVENTS_DEFAULT,
+    ):
+        self.ttl_sec = ttl_sec
+        self.max_events = max_events
+        # insertion order is expiry order since the TTL is the same for all
+        self._expires_at: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._expires_at)
+
+    def add(self, event_id: str) -> bool:
+        now = time.monotonic()
+        expires_at = self._expires_at.get(event_id)
+        if expires_at is not None and expires_at > now:
+            return False
+        while self._expires_at:
+            oldest, expires_at = next(iter(self._expires_at.items()))
+            if expires_at > now and len(self._expires_at) < self.max_events:
+                break
+            del self._expires_at[oldest]
+        self._expires_at[event_id] = now + self.ttl_sec
+        return True
+
+    def discard(self, event_id: str) -> None:
+        self._expires_at.pop(event_id, None)
+
+    def clear(self) -> None:
+        self._expires_at.clear()
+
+
+class SQLiteSeenEventStore:
+    """Event IDs seen in the last `ttl_sec` seconds, shared between the
+    processes (and restarts) of a deployment."""
+
+    PURGE_EVERY = 1_000  # delete the expired events every N additions
+
+    def __init__(
+        self,
+        path: Union[str, Path] = ":memory:",
+        ttl_sec: float = EVENT_TTL_SEC_DEFAULT,
+    ):
+        self.ttl_sec = ttl_sec
+        self._nb_added = 0
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS seen_events (
+                event_id TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            )
+            """)
+        self.connection.commit()
+
+    def add(self, event_id: str) -> bool:
+        now = time.time()
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO seen_events (event_id, expires_at) VALUES (?, ?) "
+                "ON CONFLICT (event_id) DO UPDATE SET expires_at = excluded.expires_at "
+                "WHERE seen_events.expires_at <= ?",
+                (event_id, now + self.ttl_sec, now),
+            )
+            self._nb_added += 1
+            if self._nb_added % self.PURGE_EVERY == 0:
+                self.connection.execute(
+                    "DELETE FROM seen_events WHERE expires_at <= ?", (now,)
+                )
+        return cursor.rowcount > 0
+
+    def discard(self, event_id: str) -> None:
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM seen_events WHERE event_id = ?", (event_id,)
+            )
+
+    def clear(self) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM seen_events")
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+@dataclass
+class DedupStats:
+    nb_events: int = 0
+    nb_duplicates: int = 0
+    nb_retries: int = 0  # deliveries flagged as retries by Slack
+
+
+class EventDeduplicator:
+    """Drop the Slack events that were already received.
+
+    Works on the raw request body, before any validation: an event is a
+    duplicate if its `event_id`, or the message it is about (channel and
+    ts), was seen within the store's TTL. Slack sends both a `message` and
+    an `app_mention` event, with different IDs, when the bot is mentioned in
+    a channel it is in: only the first one is processed. Retries
+    (`X-Slack-Retry-Num` header) of events never seen, e.g. received by a
+    process that died, are processed normally. Bodies without an
+    `event_id` (URL verification, ...) are never duplicates.
+
+    An event is recorded when it is received: if processing it then fails,
+    `forget` it so that Slack's retry of it is not dropped.
+    """
+
+    def __init__(self, store: Optional[SeenEventStore] = None):
+        self.store = InMemorySeenEventStore() if store is None else store
+        self.stats = DedupStats()
+
+    def is_duplicate(
+        self, body: Mapping[str, Any], headers: Optional[Mapping[str, str]] = None
+    ) -> bool:
+        event_id = body.get("event_id")
+        if not isinstance(event_id, str):
+            return False
+        self.stats.nb_events += 1
+        if headers is not None and headers.get(SLACK_RETRY_NUM_HEADER) is not None:
+            self.stats.nb_retries += 1
+        is_new_event = self.store.add(event_id)
+        message_key = _message_key(body)
+        is_new_message = message_key is None or self.store.add(message_key)
+        if is_new_event and is_new_message:
+            return False
+        self.stats.nb_duplicates += 1
+        return True
+
+    def forget(self, body: Mapping[str, Any]) -> None:
+        """Undo the recording of the event by `is_duplicate`."""
+        event_id = body.get("event_id")
+        if not isinstance(event_id, str):
+            return
+        self.store.discard(event_id)
+        message_key = _message_key(body)
+        if message_key is not None:
+            self.store.discard(message_key)
+
+
+def _message_key(body: Mapping[str, Any]) -> Optional[str]:
+    """Key of the message an event is about, None if it has none."""
+    event = body.get("event")
+    if not isinstance(event, dict):
+        return None
+    channel, ts = event.get("channel"), event.get("ts")
+    if not isinstance(channel, str) or not isinstance(ts, str):
+        return None
+    return f"message:{channel}:{ts}"
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+IDENTITY_CACHE_PATH_DEFAULT = (
+    Path(tempfile.gettempdir()) / "llm_agents_bot_identity.json"
+)
+IDENTITY_CACHE_TTL_SEC_DEFAULT = 24 * 3600
+
+
+class BotIdentityCache:
+    """Bot user IDs cached in a small JSON file, valid for `ttl_sec`.
+
+    The file is shared by every process of the machine, so only the first
+    one to start asks the platform who the bot is. Entries are keyed on a
+    hash of the API URL and token (the token itself is not written), and
+    the file is replaced atomically so concurrent writers cannot corrupt it.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = IDENTITY_CACHE_PATH_DEFAULT,
+        ttl_sec: float = IDENTITY_CACHE_TTL_SEC_DEFAULT,
+    ):
+        self.path = Path(path)
+        self.ttl_sec = ttl_sec
+
+    @staticmethod
+    def _key(api_url: str, token: str) -> str:
+        return hashlib.sha256(f"{api_url}\n{token}".encode("utf-8")).hexdigest()
+
+    def _read(self) -> dict[str, dict[str, Union[str, float]]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def get(self, api_url: str, token: str) -> Optional[str]:
+        entry = self._read().get(self._key(api_url, token))
+        if (
+            not isinstance(entry, dict)
+            or float(entry.get("expires_at", 0)) <= time.time()
+        ):
+            return None
+        user_id = entry.get("user_id")
+        return user_id if isinstance(user_id, str) else None
+
+    def set(self, api_url: str, token: str, user_id: str) -> None:
+        now = time.time()
+        entries = {
+            key: entry
+            for key, entry in self._read().items()
+            if isinstance(entry, dict) and float(entry.get("expires_at", 0)) > now
+        }
+        entries[self._key(api_url, token)] = {
+            "user_id": user_id,
+            "expires_at": now + self.ttl_sec,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # the cache is an optimization: never fail because of it
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
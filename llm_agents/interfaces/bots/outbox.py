@@ -0,0 +1,292 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, Optional
+
+from llm_agents.interfaces.bots._base import Bot, BotRateLimitedError, MessageContext
+from llm_agents.utils.rate_limit import TokenBucket
+
+# Slack: ~1 message per second per channel, short bursts tolerated
+OUTBOX_CALLS_PER_SEC_PER_CHANNEL = 1.0
+OUTBOX_BURST_PER_CHANNEL = 3
+# calls of the burst kept for frames someone waits for (e.g. a final header)
+OUTBOX_RESERVED_CALLS = 1
+
+
+@dataclass
+class OutboxStats:
+    nb_submitted: int = 0
+    nb_sent: int = 0
+    nb_superseded: int = 0  # frames replaced by a newer one before being sent
+    nb_rate_limited: int = 0
+    nb_failed: int = 0
+    last_error: Optional[Exception] = None
+
+
+@dataclass
+class _Frame:
+    context: MessageContext  # snapshot of the message when it was submitted
+    kwargs: dict[str, Any]
+    waiters: list["asyncio.Future[str]"] = field(default_factory=list)
+
+
+class _ChannelQueue:
+    def __init__(self, channel_id: str, bucket: TokenBucket):
+        self.channel_id = channel_id
+        self.bucket = bucket
+        self.pending: OrderedDict[str, _Frame] = OrderedDict()
+        self.in_flight: Optional[tuple[str, _Frame]] = None
+        self.paused_until = 0.0
+        self.task: Optional[asyncio.Task[None]] = None
+        self.wakeup = asyncio.Event()
+        self.nb_senders = 0  # `send` calls posting a new message
+
+    def frame(self, message_id: str) -> Optional[_Frame]:
+        """The frame of the message waiting to be sent or being sent."""
+        frame = self.pending.get(message_id)
+        if frame is None and self.in_flight is not None:
+            in_flight_id, in_flight = self.in_flight
+            if in_flight_id == message_id:
+                frame = in_flight
+        return frame
+
+    @property
+    def is_next_urgent(self) -> bool:
+        """Is someone waiting for the next frame to be sent?"""
+        return bool(self.pending) and bool(next(iter(self.pending.values())).waiters)
+
+
+class MessageOutbox:
+    """Coalesce and pace the message updates sent by a bot.
+
+    Only the latest content submitted for a message is kept: a frame
+    submitted while an older one is still pending replaces it, so fast
+    animations cost at most one call per tick of the channel's schedule.
+    Each channel is drained by its own worker, one call at a time, paced by a
+    token bucket (`calls_per_sec` with bursts of `burst`). When the platform
+    answers with a rate limit, the channel pauses for `retry_after` seconds
+    and the frame is retried unless a newer one replaced it.
+
+    Frames that nobody waits for (animations) leave `reserved_calls` calls of
+    the burst unused, so the frames sent with `send` go out without delay.
+
+    Once a channel has nothing left to send, its worker waits for the bucket
+    to refill (and any rate limit pause to end) before dropping the channel,
+    so forgetting it never resets its pace.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        calls_per_sec: float = OUTBOX_CALLS_PER_SEC_PER_CHANNEL,
+        burst: float = OUTBOX_BURST_PER_CHANNEL,
+        reserved_calls: float = OUTBOX_RESERVED_CALLS,
+    ):
+        self.bot = bot
+        self.calls_per_sec = calls_per_sec
+        self.burst = burst
+        self.reserved_calls = reserved_calls
+        self.stats = OutboxStats()
+        self._channels: dict[str, _ChannelQueue] = {}
+
+    def __len__(self) -> int:
+        """Number of messages with a frame waiting to be sent."""
+        return sum(len(channel.pending) for channel in self._channels.values())
+
+    def _get_channel(self, channel_id: str) -> _ChannelQueue:
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = _ChannelQueue(
+                channel_id, TokenBucket(self.calls_per_sec, self.burst)
+            )
+            self._channels[channel_id] = channel
+        return channel
+
+    def _start_worker(self, channel: _ChannelQueue) -> None:
+        if channel.task is None:
+            channel.task = asyncio.create_task(self._run_channel(channel))
+        else:
+            channel.wakeup.set()
+
+    def submit(self, context: MessageContext, **kwargs: Any) -> None:
+        """Queue the current content of an already posted message.
+
+        Returns immediately. `kwargs` are passed to `Bot.send_message`.
+        """
+        if context.message_id is None:
+            raise ValueError("Only posted messages can be queued: use `send`")
+        channel = self._get_channel(context.channel_id)
+        frame = _Frame(replace(context), kwargs)
+        previous = channel.pending.get(context.message_id)
+        if previous is not None:
+            frame.waiters = previous.waiters
+            self.stats.nb_superseded += 1
+        channel.pending[context.message_id] = frame
+        self.stats.nb_submitted += 1
+        self._start_worker(channel)
+
+    async def send(self, context: MessageContext, **kwargs: Any) -> str:
+        """Send the message and wait until it is delivered.
+
+        New messages are posted right away (within the channel's rate);
+        updates go through the queue, ahead of the frames only submitted.
+        Returns the message ID.
+        """
+        if context.message_id is not None:
+            self.submit(context, **kwargs)
+            # someone waits for this frame: serve it before the animations
+            channel = self._channels[context.channel_id]
+            channel.pending.move_to_end(context.message_id, last=False)
+            await self.flush(context)
+            return context.message_id
+
+        channel = self._get_channel(context.channel_id)
+        channel.nb_senders += 1
+        try:
+            while True:
+                await self._wait_turn(channel, urgent=True)
+                try:
+                    message_id = await self.bot.send_message(context, **kwargs)
+                except BotRateLimitedError as e:
+                    self._pause(channel, e.retry_after)
+                    continue
+                self.stats.nb_sent += 1
+                return message_id
+        finally:
+            channel.nb_senders -= 1
+            # the worker drops the channel once it is idle
+            self._start_worker(channel)
+
+    async def flush(self, context: Optional[MessageContext] = None) -> None:
+        """Wait until the frames of `context` (by default: all frames) are sent.
+
+        Raises the error of the last frame of `context` if it failed.
+        """
+        if context is None:
+            contexts = [
+                replace(frame.context)
+                for channel in self._channels.values()
+                for frame in [
+                    *channel.pending.values(),
+                    *([channel.in_flight[1]] if channel.in_flight else []),
+                ]
+            ]
+            await asyncio.gather(
+                *(self.flush(c) for c in contexts), return_exceptions=True
+            )
+            return
+
+        channel = self._channels.get(context.channel_id)
+        if channel is None or context.message_id is None:
+            return
+        frame = channel.frame(context.message_id)
+        if frame is None:
+            return
+        waiter: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        frame.waiters.append(waiter)
+        channel.wakeup.set()
+        await waiter
+
+    async def aclose(self) -> None:
+        """Send what is pending, then stop."""
+        await self.flush()
+        for channel in self._channels.values():
+            if channel.task is not None:
+                channel.task.cancel()
+        self._channels.clear()
+
+    def _pause(self, channel: _ChannelQueue, retry_after: float) -> None:
+        self.stats.nb_rate_limited += 1
+        channel.paused_until = max(channel.paused_until, time.monotonic() + retry_after)
+
+    async def _wait_turn(
+        self, channel: _ChannelQueue, urgent: Optional[bool] = None
+    ) -> None:
+        """Wait until the channel may be called. If `urgent` is None, it
+        depends on the next pending frame (re-checked when woken up)."""
+        while True:
+            delay = channel.paused_until - time.monotonic()
+            if delay <= 0:
+                is_urgent = channel.is_next_urgent if urgent is None else urgent
+                delay = channel.bucket.time_until_available(
+                    1 if is_urgent else 1 + self.reserved_calls
+                )
+                if delay <= 0:
+                    break
+            channel.wakeup.clear()
+            try:
+                await asyncio.wait_for(channel.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        await channel.bucket.acquire()
+
+    async def _run_channel(self, channel: _ChannelQueue) -> None:
+        try:
+            while await self._has_work(channel):
+                await self._wait_turn(channel)
+                message_id, frame = channel.pending.popitem(last=False)
+                channel.in_flight = (message_id, frame)
+                try:
+                    await self.bot.send_message(frame.context, **frame.kwargs)
+                except BotRateLimitedError as e:
+                    self._pause(channel, e.retry_after)
+                    newer = channel.pending.get(message_id)
+                    if newer is None:
+                        channel.pending[message_id] = frame
+                        channel.pending.move_to_end(message_id, last=False)
+                    else:
+                        newer.waiters = frame.waiters + newer.waiters
+                        self.stats.nb_superseded += 1
+                    continue
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    self.stats.nb_failed += 1
+                    self.stats.last_error = e
+                    for waiter in frame.waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                    continue
+                finally:
+                    channel.in_flight = None
+                self.stats.nb_sent += 1
+                for waiter in frame.waiters:
+                    if not waiter.done():
+                        waiter.set_result(message_id)
+        finally:
+            channel.task = None
+            if (
+                not channel.pending
+                and not channel.nb_senders
+                and self._channels.get(channel.channel_id) is channel
+            ):
+                del self._channels[channel.channel_id]
+
+    async def _has_work(self, channel: _ChannelQueue) -> bool:
+        """Whether a frame is pending, waiting while the channel is idle but
+        still paced (bucket refilling or rate limit pause running)."""
+        while not channel.pending:
+            delay = max(
+                channel.paused_until - time.monotonic(),
+                channel.bucket.time_until_available(channel.bucket.capacity),
+            )
+            if delay <= 0 and not channel.nb_senders:
+                return False
+            channel.wakeup.clear()
+            try:
+                await asyncio.wait_for(channel.wakeup.wait(), max(delay, 0.0) or None)
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+
+# bots live as long as the process: their outboxes are never dropped
+_OUTBOXES: dict[Bot, MessageOutbox] = {}
+
+
+def get_outbox(bot: Bot) -> MessageOutbox:
+    """The outbox shared by every user of `bot`, created on first use."""
+    outbox = _OUTBOXES.get(bot)
+    if outbox is None:
+        outbox = MessageOutbox(bot)
+        _OUTBOXES[bot] = outbox
+    return outbox
@@ -0,0 +1,83 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from llm_agents.interfaces.bots._base import (
+    PROGRESS_SWITCH_SPEED,
+    Bot,
+    MessageContext,
+)
+from llm_agents.interfaces.bots.outbox import MessageOutbox, get_outbox
+
+
+@dataclass
+class _Animation:
+    context: MessageContext
+    headers: Iterator[str]
+
+
+class ProgressTicker:
+    """Animate the header of every in-progress message on a single clock.
+
+    Messages `register` with a header generator (see `build_header_generator`)
+    and `deregister` when done. On every tick, all the registered headers
+    advance by one frame and are handed together to the outbox, which sends
+    at most one update per message at the pace of its channel. The clock
+    only runs while some message is registered.
+    """
+
+    def __init__(self, outbox: MessageOutbox, interval: float = PROGRESS_SWITCH_SPEED):
+        self.outbox = outbox
+        self.interval = interval
+        self.nb_ticks = 0
+        self._animations: dict[int, _Animation] = {}
+        self._clock: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._animations)
+
+    def register(
+        self,
+        context: MessageContext,
+        headers: Iterator[str],
+        task: Optional["asyncio.Future[Any]"] = None,
+    ) -> None:
+        """Animate the message of `context` (it must be posted already).
+
+        If `task` is given, the animation ends as soon as the task is done.
+        """
+        self._animations[id(context)] = _Animation(context, headers)
+        if task is not None:
+            task.add_done_callback(lambda _: self.deregister(context))
+        if self._clock is None:
+            self._clock = asyncio.create_task(self._run())
+
+    def deregister(self, context: MessageContext) -> None:
+        self._animations.pop(id(context), None)
+
+    def _tick(self) -> None:
+        self.nb_ticks += 1
+        for animation in self._animations.values():
+            animation.context.header = next(animation.headers)
+            self.outbox.submit(animation.context)
+
+    async def _run(self) -> None:
+        try:
+            while self._animations:
+                await asyncio.sleep(self.interval)
+                self._tick()
+        finally:
+            self._clock = None
+
+
+# bots live as long as the process: their tickers are never dropped
+_TICKERS: dict[Bot, ProgressTicker] = {}
+
+
+def get_progress_ticker(bot: Bot) -> ProgressTicker:
+    """The ticker shared by every user of `bot`, sending through its outbox."""
+    ticker = _TICKERS.get(bot)
+    if ticker is None:
+        ticker = ProgressTicker(get_outbox(bot))
+        _TICKERS[bot] = ticker
+    return ticker
@@ -1,13 +1,41 @@
+import asyncio
 from enum import Enum
+from functools import cached_property
 from typing import Any, Dict, Optional
 
-import requests
-from pydantic import BaseModel, Field, model_validator
+import aiohttp
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
 from llm_agents.config import get_environment_variable
-from llm_agents.interfaces.bots._base import APIInput, Bot, UserInput
+from llm_agents.interfaces.bots._base import (
+    APIInput,
+    Bot,
+    BotRateLimitedError,
+    MessageContext,
+    UserInput,
+)
+from llm_agents.interfaces.bots.identity import BotIdentityCache
+from llm_agents.interfaces.llms.scheduler import parse_retry_after
+from llm_agents.utils.http import PooledSession, get_default_pool
+
+SLACK_API_URL = "https://slack.com/api/"
+SLACK_REQUEST_TIMEOUT_SEC = 30
+SLACK_RETRY_AFTER_DEFAULT_SEC = 1.0
+# events the bot answers to
+SLACK_HANDLED_EVENT_TYPES = frozenset({"message", "app_mention"})
+# message subtypes which are not something a user just wrote
+SLACK_IGNORED_MESSAGE_SUBTYPES = frozenset(
+    {
+        "bot_message",
+        "message_changed",
+        "message_deleted",
+        "message_replied",
+        "channel_join",
+        "channel_leave",
+    }
+)
 
 SLACK_FEEDBACK_SECTION: list[dict[str, Any]] = [
     {"type": "divider"},
@@ -45,13 +73,36 @@ class SlackInputParsingError(Exception):
 
 
 class SlackMessageSendError(Exception):
-    def __init__(self, response: requests.Response):
+    def __init__(self, status_code: int, error: Optional[str]):
+        self.status_code = status_code
         self.error_message = "Error sending slack message.\n"
-        self.error_message += f"status_code: {response.status_code}\n"
-        self.error_message += f"error description: {response.json().get('error')}"
+        self.error_message += f"status_code: {status_code}\n"
+        self.error_message += f"error description: {error}"
         super().__init__(self.error_message)
 
 
+class SlackRateLimitedError(SlackMessageSendError, BotRateLimitedError):
+    """Slack answered 429: no call should be made before `retry_after` seconds."""
+
+    def __init__(self, retry_after: Optional[float], error: Optional[str] = None):
+        SlackMessageSendError.__init__(self, 429, error)
+        self.retry_after = (
+            SLACK_RETRY_AFTER_DEFAULT_SEC if retry_after is None else retry_after
+        )
+
+
+def _check_response(
+    status_code: int, headers: Any, res_json: Dict[str, Any]
+) -> Dict[str, Any]:
+    if status_code == 429:
+        raise SlackRateLimitedError(
+            parse_retry_after(headers.get("Retry-After")), res_json.get("error")
+        )
+    if not ((status_code == 200) and (res_json.get("ok"))):
+        raise SlackMessageSendError(status_code, res_json.get("error"))
+    return res_json
+
+
 class SlackEventData(BaseModel):
     """Structure of the 'event' object within a Slack Events API input."""
 
@@ -61,6 +112,9 @@ class SlackEventData(BaseModel):
         None, description="The text of the message, if it's a message event"
     )
     ts: str = Field(None, description="Timestamp of the event")
+    thread_ts: Optional[str] = Field(
+        None, description="Timestamp of the thread's parent message, for replies"
+    )
     type: str = Field(..., description="Type of Slack event (e.g., 'message')")
 
 
@@ -169,82 +223,177 @@ class SlackEventsAPIInput(APIInput):
         }
 
 
+# built once: validating through it skips the per-call model setup
+SLACK_EVENTS_API_INPUT_ADAPTER: TypeAdapter[SlackEventsAPIInput] = TypeAdapter(
+    SlackEventsAPIInput
+)
+SLACK_EVENTS_API_INPUT_TYPES = frozenset(SlackEventsAPIInputType.all_values())
+
+
 class SlackError(Exception): ...
 
 
 class SlackChallengeException(Exception): ...
 
 
+class SlackTransport:
+    """Non-blocking client for the Slack Web API methods used by the bot.
+
+    Requests share a pooled aiohttp session (by default the process-wide
+    one), so posting or updating a message never blocks the event loop.
+    `aclose` closes a given pool unless `owns_pool` is False, and never the
+    process-wide one, which LLM clients use too.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        api_url: str = SLACK_API_URL,
+        pool: Optional[PooledSession] = None,
+        timeout: float = SLACK_REQUEST_TIMEOUT_SEC,
+        owns_pool: bool = True,
+    ):
+        self.api_url = api_url
+        self.pool = get_default_pool() if pool is None else pool
+        self.owns_pool = pool is not None and owns_pool
+        self.headers = {
+            "Content-Type": "application/json; charset=utf-8",
+            "Authorization": f"Bearer {bot_token}",
+        }
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def call(self, method: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Call a Web API method (e.g. 'chat.update') and return its JSON."""
+        async with self.pool.session.post(
+            self.api_url + method,
+            json=payload,
+            headers=self.headers,
+            timeout=self.timeout,
+        ) as response:
+            res_json = await response.json(content_type=None)
+            return _check_response(response.status, response.headers, res_json)
+
+    async def aclose(self) -> None:
+        if self.owns_pool:
+            await self.pool.aclose()
+
+
 class SlackBot(Bot):
+    """Slack bot. Creating it makes no network call: the bot's user ID is
+    read from `identity_cache`, or fetched once by `start` (or, failing
+    that, on first use of `bot_id`) and then cached."""
 
-    URL_POST_MESSAGE = "https://slack.com/api/chat.postMessage"
-    URL_UPDATE_MESSAGE = "https://slack.com/api/chat.update"
+    METHOD_AUTH_TEST = "auth.test"
+    METHOD_POST_MESSAGE = "chat.postMessage"
+    METHOD_UPDATE_MESSAGE = "chat.update"
 
     def __init__(
         self,
         credentials: Optional[Dict[str, str]] = None,
+        api_url: str = SLACK_API_URL,
+        pool: Optional[PooledSession] = None,
+        identity_cache: Optional[BotIdentityCache] = None,
     ):
-        token = get_environment_variable("SLACK_BOT_TOKEN")
         if credentials is not None and "token" in credentials:
             token = credentials.get("token")
+        else:
+            token = get_environment_variable("SLACK_BOT_TOKEN")
         if token is None:
             raise SlackApiError(
                 "Error instantiating Slack bot: no token provided", None
             )
         self.bot_token: str = token
-        self.client = WebClient(token=self.bot_token)
-        self.bot_id = self._get_bot_id()
-        self.current_header = ""
-        self.current_body = ""
-        self.current_bot_message_id: Optional[str] = None
-        self.current_bot_thread_id: Optional[str] = None
-        self.current_bot_channel_id: Optional[str] = None
+        self.api_url = api_url
+        self.transport = SlackTransport(self.bot_token, api_url=api_url, pool=pool)
+        self.identity_cache = (
+            BotIdentityCache() if identity_cache is None else identity_cache
+        )
+        self._bot_id: Optional[str] = None
 
-    @property
-    def current_message(self):
-        """Message is a combination of header and body."""
-        return f"{self.current_header}\n{self.current_body}"
+    @cached_property
+    def client(self) -> WebClient:
+        return WebClient(token=self.bot_token, base_url=self.api_url)
 
-    def flush(self):
-        self.current_header = ""
-        self.current_body = ""
+    @property
+    def bot_id(self) -> str:
+        if self._bot_id is None:
+            self._bot_id = self.identity_cache.get(self.api_url, self.bot_token)
+        if self._bot_id is None:
+            # not started: blocking fallback
+            self._set_bot_id(self._get_bot_id())
+        assert self._bot_id is not None
+        return self._bot_id
+
+    def _set_bot_id(self, bot_id: str) -> None:
+        self._bot_id = bot_id
+        self.identity_cache.set(self.api_url, self.bot_token, bot_id)
+
+    async def start(self) -> str:
+        """Resolve the bot's user ID without blocking: from the identity
+        cache if possible, from Slack otherwise. Returns it."""
+        if self._bot_id is None:
+            self._bot_id = self.identity_cache.get(self.api_url, self.bot_token)
+        if self._bot_id is None:
+            try:
+                res_json = await self.transport.call(self.METHOD_AUTH_TEST, {})
+            except SlackMessageSendError as e:
+                raise SlackApiError(f"Error fetching bot user ID: {e}", None) from e
+            self._set_bot_id(res_json["user_id"])
+        return self.bot_id
 
     def _get_bot_id(self) -> str:
         """Fetch the agent's user ID from Slack"""
         try:
-            auth_response: dict[str, str] = self.client.auth_test()
+            auth_response = self.client.auth_test()
             return auth_response["user_id"]
         except SlackApiError as e:
             error_msg = f"Error fetching bot user ID: {e}"
-            raise SlackApiError(error_msg, auth_response) from e
+            raise SlackApiError(error_msg, e.response) from e
 
     def is_message_from_bot(self, user_id: str) -> bool:
         """Check if the message is from the agent itself"""
         return user_id == self.bot_id
 
-    def build_user_input(self, body: Dict[str, Any]) -> UserInput:
-        """Also sets:
-        - self.current_bot_thread_id
-        - self.current_bot_channel_id
-        """
+    def is_ignored_event(self, body: Dict[str, Any]) -> bool:
+        """Cheap checks on the raw body, to drop before any validation the
+        events the bot does not answer: other event types, edits and
+        deletions, and messages posted by bots (including this one).
+
+        Never calls Slack: the bot's own messages are only recognized by
+        user ID once it is known (see `start`), but they have a `bot_id`
+        anyway."""
+        if body.get("type") != SlackEventsAPIInputType.EVENT_CALLBACK.value:
+            return False
+        event = body.get("event")
+        if not isinstance(event, dict):
+            return False  # invalid: left to the validation
+        return (
+            event.get("type") not in SLACK_HANDLED_EVENT_TYPES
+            or "bot_id" in event
+            or event.get("subtype") in SLACK_IGNORED_MESSAGE_SUBTYPES
+            or (self._bot_id is not None and event.get("user") == self._bot_id)
+        )
 
+    def build_user_input(self, body: Dict[str, Any]) -> UserInput:
         if "challenge" in body:
             raise SlackChallengeException
         if "type" not in body:
             raise SlackInputParsingError("Invalid body: 'type' is not present.")
 
         request_type = body["type"]
-        if request_type not in SlackEventsAPIInputType.all_values():
+        if request_type not in SLACK_EVENTS_API_INPUT_TYPES:
             raise SlackInputParsingError(
                 f"Input 'type' should be in : '{SlackEventsAPIInputType.all_values()}' (got '{request_type}')"
             )
-        api_input = SlackEventsAPIInput(**body)
+        api_input = SLACK_EVENTS_API_INPUT_ADAPTER.validate_python(body)
 
         user_input = UserInput(
             app_id=api_input.api_app_id,
             workspace_id=api_input.team_id,
             channel_id=api_input.event.channel,  # pylint: disable=no-member
-            thread_id=api_input.event.ts,  # pylint: disable=no-member
+            # replies are keyed on their thread, other messages start one
+            thread_id=api_input.event.thread_ts  # pylint: disable=no-member
+            or api_input.event.ts,  # pylint: disable=no-member
             user_id=api_input.event.user,  # pylint: disable=no-member
             message_id=api_input.event.ts,  # pylint: disable=no-member
             message_ts=api_input.event.ts,  # pylint: disable=no-member
@@ -255,60 +404,93 @@ class SlackBot(Bot):
             ),
         )
 
-        self.current_bot_channel_id = user_input.channel_id
-        self.current_bot_thread_id = user_input.thread_id
-        self.current_bot_message_id = None
-
         return user_input
 
-    def send_message(
+    def _build_message_payload(
         self,
-        channel_id: str,
-        thread_id: Optional[str] = None,
-        message_id: Optional[str] = None,
+        context: MessageContext,
         add_feedback_section: bool = False,
         text_in_block: bool = True,
-    ) -> str:
-        """
-        if message_id is None, a new message (in the same channel/thread) is created.
-        otherwise, the message is updated.
-        """
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.bot_token}",
-        }
-        payload: Dict[str, Any] = {"channel": channel_id, "blocks": []}
-        if thread_id is not None:
-            payload["thread_ts"] = thread_id
-        if message_id:
-            payload["ts"] = message_id
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"channel": context.channel_id, "blocks": []}
+        if context.thread_id is not None:
+            payload["thread_ts"] = context.thread_id
+        if context.message_id:
+            payload["ts"] = context.message_id
         if text_in_block:
             payload["blocks"].append(
                 {
                     "type": "section",
-                    "text": {"type": "mrkdwn", "text": self.current_message},
+                    "text": {"type": "mrkdwn", "text": context.message},
                 }
             )
         else:
-            payload["text"] = self.current_message
+            payload["text"] = context.message
 
         # payload["blocks"] = []
         if add_feedback_section:
             payload["blocks"] += SLACK_FEEDBACK_SECTION
+        return payload
+
+    def _set_sent_message(
+        self, res_json: Dict[str, Any], context: MessageContext
+    ) -> str:
+        if "ts" not in res_json or not isinstance(res_json["ts"], str):
+            raise SlackApiError("Response should contain key 'ts'", res_json)
 
-        url = self.URL_POST_MESSAGE if message_id is None else self.URL_UPDATE_MESSAGE
+        context.message_id = res_json["ts"]
+        return context.message_id
 
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+    async def send_message(
+        self,
+        context: MessageContext,
+        add_feedback_section: bool = False,
+        text_in_block: bool = True,
+    ) -> str:
+        """
+        if context.message_id is None, a new message (in the context's
+        channel/thread) is created. otherwise, the message is updated.
+        """
+        payload = self._build_message_payload(
+            context, add_feedback_section, text_in_block
+        )
+        method = (
+            self.METHOD_POST_MESSAGE
+            if context.message_id is None
+            else self.METHOD_UPDATE_MESSAGE
+        )
+        res_json = await self.transport.call(method, payload)
+        return self._set_sent_message(res_json, context)
 
-        if not ((response.status_code == 200) and (response.json().get("ok"))):
-            raise SlackMessageSendError(response)
+    def send_message_sync(
+        self,
+        channel_id: str,
+        thread_id: Optional[str] = None,
+        message_id: Optional[str] = None,
+        add_feedback_section: bool = False,
+        text_in_block: bool = True,
+        header: str = "",
+        body: str = "",
+    ) -> str:
+        """Blocking version of `send_message`, for callers outside an event
+        loop. Takes the arguments of the former synchronous `send_message`,
+        the text being given as `header` and `body` rather than read from the
+        bot. Returns the message ID."""
+        context = MessageContext(
+            channel_id=channel_id,
+            thread_id=thread_id,
+            message_id=message_id,
+            header=header,
+            body=body,
+        )
 
-        res_json = response.json()
-        if "ts" not in res_json or not isinstance(res_json["ts"], str):
-            raise SlackApiError("Response should contain key 'ts'", response)
+        async def send() -> str:
+            try:
+                return await self.send_message(
+                    context, add_feedback_section, text_in_block
+                )
+            finally:
+                # the loop ends with the call: so do its connections
+                await self.transport.pool.release()
 
-        self.current_bot_message_id = res_json["ts"]
-        self.current_bot_thread_id = thread_id
-        self.current_bot_channel_id = channel_id
-        return self.current_bot_message_id
+        return asyncio.run(send())
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+from llm_agents.interfaces.bots._base import (
+    Bot,
+    MessageContext,
+    get_header_done,
+    get_header_error,
+)
+from llm_agents.interfaces.bots.outbox import MessageOutbox, get_outbox
+
+# Slack allows ~1 chat.update per second per message (Tier 3 bursts aside)
+STREAM_UPDATE_INTERVAL_SEC = 1.0
+STREAM_HEADER_DEFAULT = "`✍️ En rédaction ...`"
+
+
+class StreamingMessage:
+    """Push a stream of text deltas into a bot message as it is generated.
+
+    The first delta is posted right away; later deltas are coalesced so the
+    message is edited at most once every `update_interval` seconds, with a
+    single edit in flight at a time (edits cannot arrive out of order). The
+    final text is always sent when the stream ends, under an error header if
+    the stream failed. Nothing is posted for a stream without any text.
+
+    The message is the one of `context`: a new message is posted if its
+    `message_id` is not set yet. Edits go through the bot's outbox, so they
+    also share the channel's rate with the other messages of the channel.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        context: MessageContext,
+        header: str = STREAM_HEADER_DEFAULT,
+        update_interval: float = STREAM_UPDATE_INTERVAL_SEC,
+        outbox: Optional[MessageOutbox] = None,
+    ):
+        self.bot = bot
+        self.outbox = get_outbox(bot) if outbox is None else outbox
+        self.context = context
+        self.header = header
+        self.update_interval = update_interval
+        self.text = ""
+        self.nb_updates = 0
+        self._sent: Optional[tuple[str, str]] = None
+        self._dirty = asyncio.Event()
+        self._closed = asyncio.Event()
+
+    async def _push(self) -> None:
+        frame = (self.header, self.text)
+        if frame == self._sent:
+            return
+        self.context.header, self.context.body = frame
+        await self.outbox.send(self.context)
+        self._sent = frame
+        self.nb_updates += 1
+
+    async def _run_updates(self) -> None:
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            await self._push()
+            if self._closed.is_set():
+                return
+            try:
+                await asyncio.wait_for(self._closed.wait(), self.update_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def pipe(
+        self, deltas: AsyncIterator[str], final_header: Optional[str] = None
+    ) -> str:
+        """Consume the deltas, mirror them in the message and return the text.
+
+        `final_header` replaces the header once the stream is complete
+        (defaults to the "done" header with the elapsed time). If the stream
+        fails, its error is raised once what was received is sent.
+        """
+        start_time = time.monotonic()
+        updates = asyncio.create_task(self._run_updates())
+        failed = True
+        try:
+            async for delta in deltas:
+                self.text += delta
+                self._dirty.set()
+            self.header = (
+                get_header_done(time_elapsed=time.monotonic() - start_time)
+                if final_header is None
+                else final_header
+            )
+            failed = False
+        finally:
+            if failed:
+                self.header = get_header_error(time.monotonic() - start_time)
+            self._closed.set()
+            if self.text or self.context.message_id is not None:
+                # flush what was received, even if the stream failed
+                self._dirty.set()
+                try:
+                    await updates
+                except Exception:  # pylint: disable=broad-exception-caught
+                    if not failed:
+                        raise  # else: the stream's error is the one to raise
+            else:
+                updates.cancel()
+                await asyncio.gather(updates, return_exceptions=True)
+        return self.text
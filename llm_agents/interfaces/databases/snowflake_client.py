@@ -1,9 +1,11 @@
+import math
 import re
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from snowflake import connector
 
 from llm_agents.config import get_environment_variable
+from llm_agents.utils.deadline import current_deadline
 
 ACCOUNT = get_environment_variable("SNOWFLAKE_ACCOUNT")
 USER = get_environment_variable("SNOWFLAKE_USER")
@@ -15,6 +17,9 @@ DATABASE = get_environment_variable("SNOWFLAKE_DATABASE")
 for var_env in [ACCOUNT, USER, PASSWORD, ROLE, WAREHOUSE, DATABASE]:
     assert var_env is not None
 
+# error of a query cancelled by Snowflake, e.g. when it exceeded its timeout
+SNOWFLAKE_QUERY_CANCELED_ERRNO = 604
+
 
 class SnowflakeQueryError(Exception):
 
@@ -22,6 +27,9 @@ class SnowflakeQueryError(Exception):
         super().__init__(message)
 
 
+class SnowflakeQueryTimeoutError(SnowflakeQueryError, TimeoutError): ...
+
+
 class SnowflakeClient:
 
     def __init__(
@@ -52,16 +60,37 @@ class SnowflakeClient:
                 database=self.database,
             )
 
-    def run_query(self, query: str) -> list[tuple[Any]]:
+    @staticmethod
+    def _get_timeout(timeout_sec: Optional[float]) -> Optional[int]:
+        """Timeout of a query in whole seconds: `timeout_sec`, else the time
+        left before the current deadline."""
+        if timeout_sec is None:
+            deadline = current_deadline()
+            if deadline is None:
+                return None
+            deadline.check()
+            timeout_sec = deadline.remaining()
+        return max(1, math.ceil(timeout_sec))
+
+    def run_query(
+        self, query: str, timeout_sec: Optional[float] = None
+    ) -> list[tuple[Any]]:
+        """Run the query. Snowflake cancels it after `timeout_sec` (by default,
+        when the current deadline expires): SnowflakeQueryTimeoutError."""
+        timeout = self._get_timeout(timeout_sec)
         self._connect()
 
         try:
             with self.connection.cursor() as cursor:
-                cursor.execute(query)
+                cursor.execute(query, timeout=timeout)
                 data = cursor.fetchall()
 
             return data
         except connector.errors.ProgrammingError as e:
+            if timeout is not None and e.errno == SNOWFLAKE_QUERY_CANCELED_ERRNO:
+                raise SnowflakeQueryTimeoutError(
+                    f"Query timed out after {timeout}s: {e}"
+                ) from e
             raise SnowflakeQueryError(f"Query failed: {e}") from e
 
         finally:
@@ -69,13 +98,17 @@ class SnowflakeClient:
                 self.connection.close()
                 self.connection = None
 
-    def run_query_return_listdict(self, query: str) -> list[dict[str, Any]]:
-        data = self.run_query(query)
+    def run_query_return_listdict(
+        self, query: str, timeout_sec: Optional[float] = None
+    ) -> list[dict[str, Any]]:
+        data = self.run_query(query, timeout_sec)
         column_names = self.parse_sql_query_column_names(query)
         return self.format_sql_output_as_dict(column_names, data)
 
-    def run_query_return_tablemkdwn(self, query: str) -> str:
-        data = self.run_query(query)
+    def run_query_return_tablemkdwn(
+        self, query: str, timeout_sec: Optional[float] = None
+    ) -> str:
+        data = self.run_query(query, timeout_sec)
         column_names = self.parse_sql_query_column_names(query)
         return self.format_sql_output_as_table_markdown(column_names, data)
 
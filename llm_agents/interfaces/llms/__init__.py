@@ -1 +1,36 @@
-from .anthropic import ClaudeClient, ClaudeModel, LLMClient, LLMModel
+from ._base import Prompt, PromptBlock
+from .anthropic import (
+    ClaudeClient,
+    ClaudeModel,
+    ClaudeUsage,
+    LLMClient,
+    LLMModel,
+    StreamEvent,
+    StreamEventType,
+)
+from .cache import CacheStats, ResponseCache, payload_fingerprint
+from .hedging import HedgeMetrics, HedgePolicy, Hedger, LatencyTracker
+from .history import HistoryWindow
+from .limiter import (
+    ConcurrencyLimiter,
+    LimiterMetrics,
+    Priority,
+    current_priority,
+    get_default_limiter,
+    priority_scope,
+)
+from .scheduler import (
+    RequestScheduler,
+    RetryableRequestError,
+    RetryPolicy,
+    get_default_scheduler,
+)
+from .sessions import (
+    InMemorySessionStore,
+    SessionKey,
+    SessionStore,
+    SQLiteSessionStore,
+    Turn,
+)
+from .sse import SSEEvent, SSEParser
+from .tokens import estimate_tokens
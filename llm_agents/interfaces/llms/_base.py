@@ -1,28 +1,54 @@
+from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Protocol, Union
+from typing import Any, AsyncIterator, Optional, Protocol, Union
+
+from llm_agents.utils.deadline import Deadline
+
+from .limiter import Priority
+from .sessions import SessionKey
+
+
+@dataclass
+class PromptBlock:
+    text: str
+    cache: bool = False
 
 
 class Prompt:
+    """System prompt made of lines.
+
+    Lines can be followed by a cache breakpoint (`cache_breakpoints` holds the
+    0-indexed lines after which one is set): the prompt is then rendered as
+    blocks, the ones ending on a breakpoint being cacheable by the provider.
+    """
 
     def __init__(
-        self, text: Optional[Union[str, "Prompt", list[Union[str, "Prompt"]]]] = None
+        self,
+        text: Optional[Union[str, "Prompt", list[Union[str, "Prompt"]]]] = None,
+        cache: bool = False,
     ):
         self.lines: list[str]
+        self.cache_breakpoints: set[int] = set()
         if isinstance(text, str):
             self.lines = [text]
         elif isinstance(text, Prompt):
             self.lines = text.lines
+            self.cache_breakpoints = set(text.cache_breakpoints)
         elif isinstance(text, list):
             self.lines = []
             for t in text:
                 if isinstance(t, str):
                     self.lines += [t]
                 elif isinstance(t, Prompt):
+                    offset = len(self.lines)
                     self.lines += t.lines
+                    self.cache_breakpoints |= {offset + i for i in t.cache_breakpoints}
                 else:
                     raise NotImplementedError
         else:
             raise NotImplementedError
+        if cache and self.lines:
+            self.cache_breakpoints.add(len(self.lines) - 1)
 
     def display(self) -> str:
         """exclude: lines to exclude in the prompt. 1-indexed"""
@@ -41,10 +67,32 @@ class Prompt:
         filtered_lines = self.filter(exclude_lines)
         return "\n".join(filtered_lines)
 
+    def blocks(self, exclude_lines: Optional[list[int]] = None) -> list[PromptBlock]:
+        """Split the prompt on its cache breakpoints.
+
+        Joining the texts of the blocks gives the same string as `__call__`.
+        """
+        exclude_lines = [] if exclude_lines is None else exclude_lines
+        blocks: list[PromptBlock] = []
+        group: list[str] = []
+        for i, line in enumerate(self.lines):
+            if (i + 1) not in exclude_lines:
+                group.append(line)
+            if i in self.cache_breakpoints and group:
+                blocks.append(PromptBlock("\n".join(group), cache=True))
+                group = []
+        if group:
+            blocks.append(PromptBlock("\n".join(group), cache=False))
+        for block in blocks[:-1]:
+            block.text += "\n"
+        return blocks
+
+    def with_cache_breakpoint(self) -> "Prompt":
+        """Copy of the prompt with a cache breakpoint after its last line."""
+        return Prompt(self, cache=True)
+
     def __add__(self, other: Union[str, "Prompt"]) -> "Prompt":
-        if isinstance(other, str):
-            return Prompt(self.lines + [other])
-        return Prompt(self.lines + other.lines)
+        return Prompt([self, other])
 
     def __radd__(self, other: Union[str, "Prompt"]) -> "Prompt":
         return self.__add__(other)
@@ -72,4 +120,9 @@ class LLMClient(Protocol):
         is_stream: bool = False,
         stream_delay_sec: float = 0.1,
         limit_history: Optional[int] = None,
+        session_key: Optional[SessionKey] = None,
+        priority: Optional[Priority] = None,
+        deadline: Optional[Deadline] = None,
     ) -> str: ...
+
+    def stream_text(self, message: str, **kwargs: Any) -> AsyncIterator[str]: ...
@@ -1,12 +1,39 @@
 import asyncio
-import json
-from typing import Any, Optional
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, AsyncIterator, Optional
 
 import aiohttp
 
 from llm_agents.config import get_environment_variable
+from llm_agents.utils.deadline import (
+    Deadline,
+    current_deadline,
+    enforce_deadline,
+    iterate_until,
+)
+from llm_agents.utils.http import PooledSession, get_default_pool
 
 from ._base import LLMClient, LLMModel, Prompt
+from .cache import ResponseCache, payload_fingerprint
+from .hedging import Hedger, HedgeMetrics, HedgePolicy
+from .history import HistoryWindow
+from .limiter import (
+    ConcurrencyLimiter,
+    Priority,
+    current_priority,
+    get_default_limiter,
+)
+from .scheduler import (
+    RETRYABLE_STATUSES,
+    RequestScheduler,
+    RetryableRequestError,
+    get_default_scheduler,
+    parse_retry_after,
+)
+from .sessions import InMemorySessionStore, SessionKey, SessionStore, Turn
+from .sse import SSEParser
+from .tokens import estimate_messages_tokens, estimate_tokens
 
 ANTHROPIC_API_KEY: str = get_environment_variable("ANTHROPIC_API_KEY")
 
@@ -14,10 +41,22 @@ URL_ANTHROPIC_MESSAGE = "https://api.anthropic.com/v1/messages"
 
 SYSTEM_PROMPT = ""
 
+# a connection sending nothing for this long is stuck: retried as an error
+READ_TIMEOUT_SEC_DEFAULT = 120.0
+
+MAX_CACHE_BREAKPOINTS = 4  # limit of cache_control blocks per request
+
+# stream events carrying nothing we use: not even decoded
+SKIPPED_STREAM_EVENTS = ("ping", "content_block_start", "content_block_stop")
+
 
 class ClaudeSendMessageError(Exception): ...
 
 
+class ClaudeRetryableError(ClaudeSendMessageError, RetryableRequestError):
+    """Rate limit (429), overload (529), server or connection error."""
+
+
 class ClaudeModel(LLMModel):
     """Claude Models available through their API."""
 
@@ -26,102 +65,455 @@ class ClaudeModel(LLMModel):
     SONNET3P5 = "claude-3-5-sonnet-20241022"
 
 
+@dataclass
+class ClaudeUsage:
+    """Tokens reported in the `usage` block of the Messages API."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    nb_requests: int = 0
+
+    def add(self, usage: dict[str, Any]) -> None:
+        self.input_tokens += usage.get("input_tokens") or 0
+        self.output_tokens += usage.get("output_tokens") or 0
+        self.cache_creation_input_tokens += (
+            usage.get("cache_creation_input_tokens") or 0
+        )
+        self.cache_read_input_tokens += usage.get("cache_read_input_tokens") or 0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """Share of the prompt tokens read from the cache."""
+        total = (
+            self.input_tokens
+            + self.cache_creation_input_tokens
+            + self.cache_read_input_tokens
+        )
+        return self.cache_read_input_tokens / total if total else 0.0
+
+
+class StreamEventType(str, Enum):
+    DELTA = "delta"  # a chunk of the answer
+    USAGE = "usage"  # tokens used by the request, once the answer is complete
+    STOP = "stop"  # end of the answer
+
+
+@dataclass
+class StreamEvent:
+    type: StreamEventType
+    text: str = ""
+    usage: Optional[ClaudeUsage] = None
+    stop_reason: Optional[str] = None
+
+
+def build_system_blocks(system_prompt: Prompt) -> list[dict[str, Any]]:
+    """Render a prompt as system blocks, with `cache_control` on breakpoints.
+
+    Only the last `MAX_CACHE_BREAKPOINTS` breakpoints are kept: they cover
+    the longest cacheable prefixes. Blank blocks, which the API rejects, are
+    skipped.
+    """
+    blocks = [block for block in system_prompt.blocks() if block.text.strip()]
+    cached_indexes = [i for i, block in enumerate(blocks) if block.cache]
+    kept = set(cached_indexes[-MAX_CACHE_BREAKPOINTS:])
+    system: list[dict[str, Any]] = []
+    for i, block in enumerate(blocks):
+        system_block: dict[str, Any] = {"type": "text", "text": block.text}
+        if i in kept:
+            system_block["cache_control"] = {"type": "ephemeral"}
+        system.append(system_block)
+    return system
+
+
+def get_system_text(payload: dict[str, Any]) -> str:
+    system = payload.get("system", "")
+    if isinstance(system, str):
+        return system
+    return "".join(block["text"] for block in system)
+
+
 class ClaudeClient(LLMClient):
+    """Client for the Anthropic Messages API.
+
+    HTTP connections are kept in a pool (by default the process-wide one), so
+    consecutive calls reuse keep-alive connections instead of paying DNS, TCP
+    and TLS setup on every request. Pass a dedicated `PooledSession` to get
+    separate connection limits. Closing the client closes that pool, unless
+    `owns_pool` is False (e.g. it is shared); the process-wide pool is never
+    closed by a client.
+
+    Conversation histories live in a `SessionStore`, one per `SessionKey`
+    (workspace, channel, thread). Calls made without a key share the default
+    conversation, exposed as `history`. A `HistoryWindow` bounds the history
+    re-sent with each message by a token budget rather than a number of turns.
+
+    Requests go through a `RequestScheduler` (by default the process-wide
+    one): they wait for its requests/tokens per minute budget, if any, and are retried
+    with backoff on 429, 529 and other transient errors. A `ConcurrencyLimiter`
+    (by default the process-wide one) bounds the number of requests in flight,
+    serving interactive requests before background ones.
+
+    With a `ResponseCache`, non-streamed answers are cached by payload hash:
+    identical (model, system prompt, messages, max_tokens) requests are
+    answered without calling the API. Only use it for deterministic calls.
+
+    System prompts with cache breakpoints (see `Prompt`) are sent as blocks
+    with `cache_control`, so the API can reuse their processing between
+    requests. `usage` accumulates the tokens reported by the API, including
+    cache reads and writes; `last_usage` holds those of the latest request.
+
+    A request whose connection stays silent for `read_timeout_sec` is retried.
+    `send` and `stream` stop at their `deadline` (by default, the current
+    one, see `deadline_scope`), raising DeadlineExceededError.
+
+    With a `HedgePolicy`, interactive non-streamed requests slower than the
+    policy's latency percentile are duplicated (possibly on a faster model)
+    and the first answer wins; see `hedge_metrics`. Answers of another model
+    are not cached.
+    """
 
     def __init__(
         self,
         system_prompt: Optional[Prompt] = None,
         model: ClaudeModel = ClaudeModel.SONNET3P5,
+        url: str = URL_ANTHROPIC_MESSAGE,
+        pool: Optional[PooledSession] = None,
+        session_store: Optional[SessionStore] = None,
+        history_window: Optional[HistoryWindow] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        limiter: Optional[ConcurrencyLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        read_timeout_sec: Optional[float] = READ_TIMEOUT_SEC_DEFAULT,
+        hedge: Optional[HedgePolicy] = None,
+        owns_pool: bool = True,
     ):
         self.system_prompt = Prompt("") if system_prompt is None else system_prompt
         self.model = model
+        self.url = url
+        self.pool = get_default_pool() if pool is None else pool
+        self.owns_pool = pool is not None and owns_pool
         self.headers = {
             "x-api-key": ANTHROPIC_API_KEY,
             "anthropic-version": "2023-06-01",
             "content-type": "application/json",
         }
-        self.history: list[list[dict[str, str]]] = []
+        self.session_store = (
+            InMemorySessionStore() if session_store is None else session_store
+        )
+        self.history_window = history_window
+        self.scheduler = get_default_scheduler() if scheduler is None else scheduler
+        self.limiter = get_default_limiter() if limiter is None else limiter
+        self.cache = cache
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_read=read_timeout_sec)
+        self.hedger = None if hedge is None else Hedger(hedge)
+        self.usage = ClaudeUsage()
+        self.last_usage = ClaudeUsage()
+
+    async def __aenter__(self) -> "ClaudeClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Release the pooled connections if the client owns its pool. The pool
+        re-opens lazily if reused."""
+        if self.owns_pool:
+            await self.pool.aclose()
+
+    @property
+    def hedge_metrics(self) -> Optional[HedgeMetrics]:
+        return None if self.hedger is None else self.hedger.metrics
+
+    @property
+    def history(self) -> list[list[dict[str, str]]]:
+        """Turns of the default conversation (calls made without a session key)."""
+        return [turn.messages for turn in self.session_store.get_turns(SessionKey())]
+
+    def clear_history(self, session_key: Optional[SessionKey] = None) -> None:
+        self.session_store.clear(SessionKey() if session_key is None else session_key)
+
+    def _add_turn(self, session_key: SessionKey, message: str, answer: str) -> None:
+        self.session_store.append_turn(
+            session_key,
+            Turn(
+                messages=[
+                    {"role": "user", "content": message},
+                    {"role": "assistant", "content": answer},
+                ]
+            ),
+        )
 
-    async def send(
+    async def _post(self, payload: dict[str, Any]) -> aiohttp.ClientResponse:
+        """Send the payload. The caller must release the response."""
+        try:
+            res = await self.pool.session.post(
+                self.url, json=payload, headers=self.headers, timeout=self.timeout
+            )
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise ClaudeRetryableError(f"Connection error: {e!r}") from e
+        if res.status == 200:
+            return res
+        async with res:
+            error_message = f"Error (status={res.status}): {await res.text()}"
+        if res.status in RETRYABLE_STATUSES:
+            raise ClaudeRetryableError(
+                error_message,
+                status=res.status,
+                retry_after=parse_retry_after(res.headers.get("retry-after")),
+            )
+        raise ClaudeSendMessageError(error_message)
+
+    def _build_payload(
         self,
         message: str,
-        is_stream: bool = False,
-        stream_delay_sec: float = 0.1,
+        session_key: SessionKey,
         limit_history: Optional[int] = None,
-    ) -> str:
+        history_window: Optional[HistoryWindow] = None,
+    ) -> dict[str, Any]:
         payload: dict[str, Any] = {
             "model": self.model.value,
             "max_tokens": 1024,
         }
-        recent_history = (
-            self.history[-limit_history:] if limit_history is not None else self.history
+        turns = self.session_store.get_turns(session_key)
+        recent_turns = turns[-limit_history:] if limit_history is not None else turns
+        history_window = (
+            self.history_window if history_window is None else history_window
         )
-        messages = [msg for list_msg in recent_history for msg in list_msg] + [
+        summary = None
+        if history_window is not None:
+            recent_turns, summary = history_window.select(recent_turns)
+        messages = [msg for turn in recent_turns for msg in turn.messages] + [
             {"role": "user", "content": message}
         ]
         payload["messages"] = messages
 
-        if self.system_prompt:
-            payload["system"] = self.system_prompt()
-        if is_stream:
-            payload["stream"] = True
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                URL_ANTHROPIC_MESSAGE, json=payload, headers=self.headers
-            ) as res:
-                if res.status != 200:
-                    error_message = f"Error (status={res.status}): {await res.text()}"
-                    raise ClaudeSendMessageError(error_message)
-
-                if is_stream:
-                    answer = ""
-                    current_event = ""
-
-                    async for line in res.content:
-                        line = line.decode("utf-8").strip()
-                        if not line:
-                            continue
-
-                        # Handle event lines
-                        if line.startswith("event: "):
-                            current_event = line[7:]  # Remove 'event: ' prefix
-                            continue
-                        # Handle data lines
-                        if not line.startswith("data: "):
-                            continue
-                        data = json.loads(line[6:])
-
-                        if current_event == "content_block_delta":
-                            if data["type"] == "content_block_delta":
-                                new_content = data["delta"]["text"]
-                                answer += new_content
-
-                                # Update display
-                                # clear_output(wait=True)
-                                # display(Markdown(answer))
-                                await asyncio.sleep(stream_delay_sec)
-                        elif current_event == "message_stop":
-                            break
+        system_prompt = (
+            self.system_prompt if summary is None else self.system_prompt + summary
+        )
+        if system_prompt.cache_breakpoints:
+            system_blocks = build_system_blocks(system_prompt)
+            if system_blocks:
+                payload["system"] = system_blocks
+        elif system_prompt:
+            payload["system"] = system_prompt()
+        return payload
+
+    def _record_usage(self, usage: dict[str, Any], estimated_tokens: int) -> None:
+        self.last_usage = ClaudeUsage(nb_requests=1)
+        self.last_usage.add(usage)
+        self.usage.add(usage)
+        self.usage.nb_requests += 1
+        self.scheduler.record_usage(
+            estimated_tokens,
+            self.last_usage.input_tokens + self.last_usage.cache_creation_input_tokens,
+        )
 
-                    self.history.append(
-                        [
-                            {"role": "user", "content": message},
-                            {"role": "assistant", "content": answer},
-                        ]
-                    )
-                    return answer
+    def _estimate_tokens(self, payload: dict[str, Any]) -> int:
+        return estimate_messages_tokens(payload["messages"]) + estimate_tokens(
+            get_system_text(payload)
+        )
 
-                # no stream
+    async def _post_in_slot(
+        self, payload: dict[str, Any], priority: Priority, workspace_id: str
+    ) -> aiohttp.ClientResponse:
+        """Take a slot of the limiter then send the payload. The slot is only
+        held by attempts, not while the scheduler waits: the caller must
+        release it with the response."""
+        await self.limiter.acquire(priority, workspace_id)
+        try:
+            return await self._post(payload)
+        except BaseException:
+            self.limiter.release()
+            raise
+
+    async def _request(
+        self, payload: dict[str, Any], priority: Priority, workspace_id: str
+    ) -> str:
+        """Send the payload through the scheduler and return the answer."""
+        estimated_tokens = self._estimate_tokens(payload)
+        res = await self.scheduler.run(
+            lambda: self._post_in_slot(payload, priority, workspace_id),
+            estimated_tokens=estimated_tokens,
+        )
+        try:
+            async with res:
                 response_data = await res.json()
-                answer = response_data["content"][0]["text"]
-                self.history.append(
-                    [
-                        {"role": "user", "content": message},
-                        {"role": "assistant", "content": answer},
-                    ]
+        finally:
+            self.limiter.release()
+        self._record_usage(response_data.get("usage", {}), estimated_tokens)
+        return response_data["content"][0]["text"]
+
+    async def _request_hedged(
+        self, payload: dict[str, Any], priority: Priority, workspace_id: str
+    ) -> tuple[str, bool]:
+        """Same as `_request`, hedged by the client's `Hedger`. Also returns
+        whether the answer came from another model."""
+        assert self.hedger is not None
+        hedge_model = self.hedger.policy.hedge_model
+        hedge_payload = (
+            payload if hedge_model is None else {**payload, "model": hedge_model.value}
+        )
+        answer, is_hedge = await self.hedger.run(
+            lambda: self._request(payload, priority, workspace_id),
+            lambda: self._request(hedge_payload, priority, workspace_id),
+        )
+        return answer, is_hedge and hedge_payload["model"] != payload["model"]
+
+    async def _request_stream(
+        self, payload: dict[str, Any], priority: Priority, workspace_id: str
+    ) -> AsyncIterator[StreamEvent]:
+        """Send the payload with `stream: true` and yield events as they come.
+
+        Retries (through the scheduler) only happen before the first event.
+        """
+        payload = {**payload, "stream": True}
+        estimated_tokens = self._estimate_tokens(payload)
+        res = await self.scheduler.run(
+            lambda: self._post_in_slot(payload, priority, workspace_id),
+            estimated_tokens=estimated_tokens,
+        )
+        usage: dict[str, Any] = {}
+        stop_reason = None
+        parser = SSEParser(skip_events=SKIPPED_STREAM_EVENTS)
+        try:
+            async with res:
+                async for chunk in res.content.iter_any():
+                    for sse in parser.feed(chunk):
+                        if sse.event == "content_block_delta":
+                            delta = sse.json()["delta"]
+                            if delta["type"] == "text_delta":
+                                yield StreamEvent(
+                                    StreamEventType.DELTA, text=delta["text"]
+                                )
+                        elif sse.event == "message_start":
+                            usage.update(sse.json()["message"].get("usage", {}))
+                        elif sse.event == "message_delta":
+                            data = sse.json()
+                            usage.update(data.get("usage", {}))
+                            stop_reason = data.get("delta", {}).get("stop_reason")
+                        elif sse.event == "error":
+                            raise ClaudeSendMessageError(
+                                f"Stream error: {sse.json().get('error')}"
+                            )
+                        elif sse.event == "message_stop":
+                            break
+                    else:
+                        continue
+                    break  # message_stop
+        finally:
+            self.limiter.release()
+
+        self._record_usage(usage, estimated_tokens)
+        yield StreamEvent(StreamEventType.USAGE, usage=self.last_usage)
+        yield StreamEvent(StreamEventType.STOP, stop_reason=stop_reason)
+
+    async def stream(
+        self,
+        message: str,
+        limit_history: Optional[int] = None,
+        session_key: Optional[SessionKey] = None,
+        history_window: Optional[HistoryWindow] = None,
+        priority: Optional[Priority] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """Send a message and yield the answer as it is generated.
+
+        Yields `DELTA` events (text chunks) as soon as they are received, then
+        one `USAGE` and one `STOP` event. The turn is added to the history once
+        the stream is complete. Arguments are the same as `send`.
+        """
+        session_key = SessionKey() if session_key is None else session_key
+        deadline = current_deadline() if deadline is None else deadline
+        priority = current_priority() if priority is None else priority
+        payload = self._build_payload(
+            message, session_key, limit_history, history_window
+        )
+        chunks: list[str] = []
+        events = self._request_stream(payload, priority, session_key.workspace_id)
+        async for event in iterate_until(events, deadline):
+            if event.type == StreamEventType.DELTA:
+                chunks.append(event.text)
+            yield event
+        self._add_turn(session_key, message, "".join(chunks))
+
+    async def stream_text(self, message: str, **kwargs: Any) -> AsyncIterator[str]:
+        """Same as `stream`, yielding only the text chunks."""
+        async for event in self.stream(message, **kwargs):
+            if event.type == StreamEventType.DELTA:
+                yield event.text
+
+    async def send(
+        self,
+        message: str,
+        is_stream: bool = False,
+        stream_delay_sec: float = 0.1,
+        limit_history: Optional[int] = None,
+        session_key: Optional[SessionKey] = None,
+        history_window: Optional[HistoryWindow] = None,
+        priority: Optional[Priority] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        """Send a message and return the answer.
+
+        is_stream: receive the answer as a stream (see `stream` to consume
+            it incrementally). `stream_delay_sec` is kept for compatibility
+            and ignored.
+        limit_history: keep at most this number of previous turns.
+        history_window: keep the previous turns fitting in a token budget
+            (defaults to the client's `history_window`). Applied after
+            `limit_history`.
+        priority: queueing class when the concurrency limit is reached
+            (defaults to the current priority, see `priority_scope`). Only
+            interactive requests are hedged.
+        deadline: stop waiting for the answer when it expires (defaults to
+            the current deadline).
+        """
+        if is_stream:
+            chunks = [
+                event.text
+                async for event in self.stream(
+                    message,
+                    limit_history,
+                    session_key,
+                    history_window,
+                    priority,
+                    deadline,
+                )
+                if event.type == StreamEventType.DELTA
+            ]
+            return "".join(chunks)
+
+        session_key = SessionKey() if session_key is None else session_key
+        deadline = current_deadline() if deadline is None else deadline
+        priority = current_priority() if priority is None else priority
+        payload = self._build_payload(
+            message, session_key, limit_history, history_window
+        )
+        cache_key = None
+        if self.cache is not None:
+            cache_key = payload_fingerprint(payload)
+            cached_answer = self.cache.get(cache_key)
+            if cached_answer is not None:
+                self._add_turn(session_key, message, cached_answer)
+                return cached_answer
+
+        workspace_id = session_key.workspace_id
+        async with enforce_deadline(deadline):
+            if self.hedger is not None and priority == Priority.INTERACTIVE:
+                answer, is_other_model = await self._request_hedged(
+                    payload, priority, workspace_id
                 )
-                return answer
+                if is_other_model:
+                    cache_key = None
+            else:
+                answer = await self._request(payload, priority, workspace_id)
+        if cache_key is not None:
+            self.cache.set(cache_key, answer)
+        self._add_turn(session_key, message, answer)
+        return answer
 
     # def send_sync(
     #     self,
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional, Union
+
+MAX_MEMORY_ENTRIES_DEFAULT = 1_024
+MAX_DISK_ENTRIES_DEFAULT = 100_000
+CACHE_TTL_SEC_DEFAULT = 24 * 3600
+
+
+def payload_fingerprint(payload: dict[str, Any]) -> str:
+    """Hash of a request payload, independent of the order of its keys."""
+    canonical = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """Two-tier cache of LLM answers keyed on `payload_fingerprint`.
+
+    - memory tier: LRU of at most `max_memory_entries` answers,
+    - disk tier (if `path` is given): SQLite table of at most
+      `max_disk_entries` answers, shared between processes and restarts.
+    Entries expire `ttl_sec` after being written. Disk hits are promoted to
+    the memory tier.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        max_memory_entries: int = MAX_MEMORY_ENTRIES_DEFAULT,
+        max_disk_entries: int = MAX_DISK_ENTRIES_DEFAULT,
+        ttl_sec: float = CACHE_TTL_SEC_DEFAULT,
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_sec = ttl_sec
+        self.stats = CacheStats()
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.connection: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self.connection = sqlite3.connect(str(path), check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_responses_access
+                    ON responses (last_access);
+                """)
+            self.connection.commit()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return value
+            del self._memory[key]
+
+        if self.connection is not None:
+            row = self.connection.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] > now:
+                with self.connection:
+                    self.connection.execute(
+                        "UPDATE responses SET last_access = ? WHERE key = ?",
+                        (now, key),
+                    )
+                self._set_memory(key, row[0], row[1])
+                self.stats.disk_hits += 1
+                return row[0]
+
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_sec
+        self._set_memory(key, value, expires_at)
+        if self.connection is None:
+            return
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            self.connection.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (now,)
+            )
+            (nb_entries,) = self.connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+            if nb_entries > self.max_disk_entries:
+                self.connection.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                    (nb_entries - self.max_disk_entries,),
+                )
+                self.stats.evictions += nb_entries - self.max_disk_entries
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _set_memory(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats.evictions += 1
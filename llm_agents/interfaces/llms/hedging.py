@@ -0,0 +1,158 @@
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from ._base import LLMModel
+
+T = TypeVar("T")
+
+HEDGE_PERCENTILE_DEFAULT = 0.95
+HEDGE_MIN_SAMPLES_DEFAULT = 20
+HEDGE_BUDGET_RATIO_DEFAULT = 0.1
+LATENCY_WINDOW_DEFAULT = 500
+
+
+@dataclass
+class HedgePolicy:
+    """When to send a duplicate ("hedge") of a slow request.
+
+    - `percentile`: a request still running after this percentile of the
+      recent latencies is hedged (0.95: the slowest 5%).
+    - `min_samples`: latencies to observe before hedging at all.
+    - `hedge_model`: model of the duplicate, e.g. a faster one (defaults to
+      the model of the request).
+    - `budget_ratio`: at most this share of the requests are hedged, so a
+      general slowdown cannot double the load.
+    """
+
+    percentile: float = HEDGE_PERCENTILE_DEFAULT
+    min_samples: int = HEDGE_MIN_SAMPLES_DEFAULT
+    hedge_model: Optional[LLMModel] = None
+    budget_ratio: float = HEDGE_BUDGET_RATIO_DEFAULT
+
+
+class LatencyTracker:
+    """Latencies of the last `window` requests."""
+
+    def __init__(self, window: int = LATENCY_WINDOW_DEFAULT):
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, latency_sec: float) -> None:
+        self._latencies.append(latency_sec)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency under which a share `q` of the requests completed (nearest
+        rank), None if no latency was recorded."""
+        if not self._latencies:
+            return None
+        latencies = sorted(self._latencies)
+        rank = min(len(latencies), max(1, math.ceil(q * len(latencies))))
+        return latencies[rank - 1]
+
+
+@dataclass
+class HedgeMetrics:
+    nb_requests: int = 0
+    nb_hedged: int = 0
+    nb_hedge_wins: int = 0  # the duplicate answered first
+    nb_over_budget: int = 0  # slow requests not hedged for lack of budget
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.nb_hedged / self.nb_requests if self.nb_requests else 0.0
+
+    @property
+    def hedge_win_rate(self) -> float:
+        """Share of the hedged requests answered by the duplicate."""
+        return self.nb_hedge_wins / self.nb_hedged if self.nb_hedged else 0.0
+
+
+class Hedger:
+    """Run requests, hedging the slow ones according to a `HedgePolicy`.
+
+    The first of the request and its duplicate to succeed wins and the other
+    is cancelled. If one fails, the other one is still awaited.
+    """
+
+    def __init__(self, policy: HedgePolicy, tracker: Optional[LatencyTracker] = None):
+        self.policy = policy
+        self.tracker = LatencyTracker() if tracker is None else tracker
+        self.metrics = HedgeMetrics()
+
+    def hedge_delay(self) -> Optional[float]:
+        """Time after which to hedge the next request, None to not hedge."""
+        if len(self.tracker) < self.policy.min_samples:
+            return None
+        return self.tracker.percentile(self.policy.percentile)
+
+    def _has_budget(self) -> bool:
+        return self.metrics.nb_hedged < self.policy.budget_ratio * (
+            self.metrics.nb_requests
+        )
+
+    async def run(
+        self,
+        request_fn: Callable[[], Awaitable[T]],
+        hedge_fn: Callable[[], Awaitable[T]],
+    ) -> tuple[T, bool]:
+        """Run `request_fn`, and `hedge_fn` if it is too slow. Returns the
+        first result and whether it came from the hedge."""
+        self.metrics.nb_requests += 1
+        delay = self.hedge_delay()
+        start = time.monotonic()
+        primary = asyncio.ensure_future(request_fn())
+        try:
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+            if delay is None or primary.done():
+                result = await primary
+                self.tracker.record(time.monotonic() - start)
+                return result, False
+            if not self._has_budget():
+                self.metrics.nb_over_budget += 1
+                result = await primary
+                self.tracker.record(time.monotonic() - start)
+                return result, False
+
+            self.metrics.nb_hedged += 1
+            hedge = asyncio.ensure_future(hedge_fn())
+            try:
+                return await self._race(primary, hedge, start)
+            finally:
+                _discard(hedge)
+        finally:
+            _discard(primary)
+
+    async def _race(
+        self, primary: "asyncio.Future[T]", hedge: "asyncio.Future[T]", start: float
+    ) -> tuple[T, bool]:
+        done, pending = await asyncio.wait(
+            {primary, hedge}, return_when=asyncio.FIRST_COMPLETED
+        )
+        # the request's latency is at least the time it has run: keeps the
+        # tail in the tracker even when the hedge wins
+        self.tracker.record(time.monotonic() - start)
+        while True:
+            for future in (primary, hedge):
+                if future in done and future.exception() is None:
+                    if future is hedge:
+                        self.metrics.nb_hedge_wins += 1
+                    return future.result(), future is hedge
+            if not pending:
+                return await primary, False  # both failed: raises its error
+            done, pending = await asyncio.wait(pending)
+
+
+def _discard(future: "asyncio.Future[T]") -> None:
+    """Cancel the future, ignoring its result or error."""
+    if future.done():
+        if not future.cancelled():
+            future.exception()
+    else:
+        future.cancel()
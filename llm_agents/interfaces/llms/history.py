@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .cache import payload_fingerprint
+from .sessions import Turn
+from .tokens import estimate_tokens
+
+SUMMARY_CHARS_PER_MESSAGE = 160
+SUMMARY_CACHE_SIZE_DEFAULT = 10_000
+SUMMARY_HEADER = "Summary of the earlier conversation (oldest first):"
+
+
+def summarize_turn(turn: Turn) -> str:
+    """One compact line per turn: truncated user and assistant messages."""
+    parts: list[str] = []
+    for msg in turn.messages:
+        content = " ".join(msg["content"].split())
+        if len(content) > SUMMARY_CHARS_PER_MESSAGE:
+            content = content[:SUMMARY_CHARS_PER_MESSAGE] + "…"
+        parts.append(f"{msg['role']}: {content}")
+    return "- " + " | ".join(parts)
+
+
+class HistoryWindow:
+    """Select the most recent turns fitting in a token budget.
+
+    Turns are walked from the newest one backwards using their cached token
+    counts, so the cost depends on the number of kept turns rather than on
+    the length of the whole history. With `summarize=True`, the evicted turns
+    are condensed into a compact prefix (at most `max_summary_tokens`) meant
+    to be appended to the system prompt. `summarize_turn_fn` builds one
+    summary line per turn; lines are cached on the turns and, since stores
+    may rebuild the turns on every load (SQLite), in the window by hash of
+    the turn's messages (the last `summary_cache_size` of them).
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        summarize: bool = False,
+        max_summary_tokens: int = 500,
+        summarize_turn_fn: Callable[[Turn], str] = summarize_turn,
+        summary_cache_size: int = SUMMARY_CACHE_SIZE_DEFAULT,
+    ):
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.max_summary_tokens = max_summary_tokens
+        self.summarize_turn_fn = summarize_turn_fn
+        self.summary_cache_size = summary_cache_size
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+
+    def select(self, turns: list[Turn]) -> tuple[list[Turn], Optional[str]]:
+        """Return the kept turns (oldest first) and the summary of the others."""
+        nb_tokens = 0
+        start = len(turns)
+        while start > 0:
+            turn_tokens = turns[start - 1].nb_tokens
+            if nb_tokens + turn_tokens > self.max_tokens:
+                break
+            nb_tokens += turn_tokens
+            start -= 1
+
+        summary = None
+        if self.summarize and start > 0:
+            summary = self._summarize(turns[:start])
+        return turns[start:], summary
+
+    def _summarize(self, evicted: list[Turn]) -> Optional[str]:
+        lines: list[str] = []
+        nb_tokens = estimate_tokens(SUMMARY_HEADER)
+        for turn in reversed(evicted):
+            if turn.summary is None:
+                turn.summary = self._get_summary(turn)
+            line_tokens = estimate_tokens(turn.summary)
+            if nb_tokens + line_tokens > self.max_summary_tokens:
+                break
+            nb_tokens += line_tokens
+            lines.append(turn.summary)
+        if not lines:
+            return None
+        return "\n".join([SUMMARY_HEADER] + lines[::-1])
+
+    def _get_summary(self, turn: Turn) -> str:
+        key = payload_fingerprint({"messages": turn.messages})
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+            return summary
+        summary = self.summarize_turn_fn(turn)
+        self._summaries[key] = summary
+        while len(self._summaries) > self.summary_cache_size:
+            self._summaries.popitem(last=False)
+        return summary
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import AsyncIterator, Iterator, Optional
+
+from llm_agents.utils.fair_queue import FairQueue
+
+MAX_CONCURRENCY_DEFAULT = 10
+
+
+class Priority(IntEnum):
+    """Priority classes of LLM requests: lower values are served first."""
+
+    INTERACTIVE = 0  # replies a user is waiting for
+    BACKGROUND = 1  # DAG steps, batch jobs
+
+
+# priority of the requests made by the current task when not given one
+# explicitly: DAG agents run in a BACKGROUND scope
+_CURRENT_PRIORITY: ContextVar[Priority] = ContextVar(
+    "current_priority", default=Priority.INTERACTIVE
+)
+
+
+def current_priority() -> Priority:
+    return _CURRENT_PRIORITY.get()
+
+
+@contextmanager
+def priority_scope(priority: Priority) -> Iterator[None]:
+    """Make `priority` the current priority. Tasks created in the scope
+    inherit it."""
+    token = _CURRENT_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _CURRENT_PRIORITY.reset(token)
+
+
+@dataclass
+class LimiterMetrics:
+    in_flight: int = 0
+    queue_depth: int = 0
+    queue_depth_by_priority: dict[str, int] = field(default_factory=dict)
+    nb_acquired: int = 0
+    nb_queued: int = 0
+    total_wait_sec: float = 0.0
+    max_wait_sec: float = 0.0
+
+    @property
+    def mean_wait_sec(self) -> float:
+        return self.total_wait_sec / self.nb_acquired if self.nb_acquired else 0.0
+
+
+class ConcurrencyLimiter:
+    """Bound the number of LLM requests in flight.
+
+    Requests beyond `max_concurrency` wait in a `FairQueue`: by `Priority`
+    first, then round-robin between workspaces. Freed slots are handed over
+    directly to the next waiter.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY_DEFAULT):
+        self.max_concurrency = max_concurrency
+        self._in_flight = 0
+        self._waiters: FairQueue[asyncio.Future[None]] = FairQueue()
+        self._nb_acquired = 0
+        self._nb_queued = 0
+        self._total_wait_sec = 0.0
+        self._max_wait_sec = 0.0
+
+    @property
+    def metrics(self) -> LimiterMetrics:
+        return LimiterMetrics(
+            in_flight=self._in_flight,
+            queue_depth=len(self._waiters),
+            queue_depth_by_priority={
+                Priority(priority).name: size
+                for priority, size in self._waiters.qsize_by_priority().items()
+            },
+            nb_acquired=self._nb_acquired,
+            nb_queued=self._nb_queued,
+            total_wait_sec=self._total_wait_sec,
+            max_wait_sec=self._max_wait_sec,
+        )
+
+    async def acquire(
+        self, priority: Priority = Priority.INTERACTIVE, workspace_id: str = ""
+    ) -> None:
+        start = time.monotonic()
+        if self._in_flight < self.max_concurrency and not len(self._waiters):
+            self._in_flight += 1
+        else:
+            self._nb_queued += 1
+            waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            self._waiters.put(waiter, key=workspace_id, priority=priority)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # the slot was handed over right before the cancellation
+                    self.release()
+                else:
+                    self._waiters.remove(waiter, key=workspace_id, priority=priority)
+                raise
+        wait_sec = time.monotonic() - start
+        self._nb_acquired += 1
+        self._total_wait_sec += wait_sec
+        self._max_wait_sec = max(self._max_wait_sec, wait_sec)
+
+    def release(self) -> None:
+        while len(self._waiters):
+            waiter = self._waiters.pop()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot goes to the waiter
+                return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: Priority = Priority.INTERACTIVE, workspace_id: str = ""
+    ) -> AsyncIterator[None]:
+        await self.acquire(priority, workspace_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_DEFAULT_LIMITER: Optional[ConcurrencyLimiter] = None
+
+
+def get_default_limiter() -> ConcurrencyLimiter:
+    """Process-wide limiter shared by clients that were not given their own."""
+    global _DEFAULT_LIMITER  # pylint: disable=global-statement
+    if _DEFAULT_LIMITER is None:
+        _DEFAULT_LIMITER = ConcurrencyLimiter()
+    return _DEFAULT_LIMITER
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from llm_agents.utils.rate_limit import TokenBucket
+
+T = TypeVar("T")
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504, 529})
+# budget of the process-wide scheduler, unlimited if not set
+REQUESTS_PER_MINUTE_ENV_VAR = "ANTHROPIC_REQUESTS_PER_MINUTE"
+TOKENS_PER_MINUTE_ENV_VAR = "ANTHROPIC_TOKENS_PER_MINUTE"
+
+
+class RetryableRequestError(Exception):
+    """Error of a request that may succeed if sent again later."""
+
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        self.status = status
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a `retry-after` header given in seconds."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter, capped at `max_delay_sec`.
+
+    A `retry-after` sent by the server takes precedence over the backoff.
+    """
+
+    max_retries: int = 5
+    base_delay_sec: float = 0.5
+    max_delay_sec: float = 30.0
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay_sec)
+        backoff = min(self.max_delay_sec, self.base_delay_sec * 2**attempt)
+        return random.uniform(0, backoff)
+
+
+@dataclass
+class SchedulerStats:
+    nb_requests: int = 0
+    nb_retries: int = 0
+    nb_failures: int = 0
+    total_wait_sec: float = 0.0
+
+
+class RequestScheduler:
+    """Send requests within a requests-per-minute and tokens-per-minute budget.
+
+    Requests wait for budget (token buckets) instead of failing, and are
+    retried on `RetryableRequestError` following the `RetryPolicy`. When the
+    server answers with a `retry-after`, every request of the scheduler is
+    held back until it expires, since the rate limit is shared. A budget left
+    to None is unlimited; the process-wide scheduler reads its budget from
+    the ANTHROPIC_REQUESTS_PER_MINUTE and ANTHROPIC_TOKENS_PER_MINUTE
+    environment variables.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        self.requests_bucket = (
+            None
+            if requests_per_minute is None
+            else TokenBucket.per_minute(requests_per_minute)
+        )
+        self.tokens_bucket = (
+            None
+            if tokens_per_minute is None
+            else TokenBucket.per_minute(tokens_per_minute)
+        )
+        self.retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+        self.stats = SchedulerStats()
+        self._paused_until = 0.0
+
+    async def _wait_for_budget(self, estimated_tokens: int) -> None:
+        start = time.monotonic()
+        while (pause_sec := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(pause_sec)
+        if self.requests_bucket is not None:
+            await self.requests_bucket.acquire(1)
+        if self.tokens_bucket is not None:
+            await self.tokens_bucket.acquire(estimated_tokens)
+        self.stats.total_wait_sec += time.monotonic() - start
+
+    async def run(
+        self, request_fn: Callable[[], Awaitable[T]], estimated_tokens: int = 0
+    ) -> T:
+        """Call `request_fn` once budget is available, retrying if needed."""
+        attempt = 0
+        while True:
+            await self._wait_for_budget(estimated_tokens)
+            self.stats.nb_requests += 1
+            try:
+                return await request_fn()
+            except RetryableRequestError as e:
+                if attempt >= self.retry_policy.max_retries:
+                    self.stats.nb_failures += 1
+                    raise
+                delay = self.retry_policy.compute_delay(attempt, e.retry_after)
+                if e.retry_after is not None:
+                    self._paused_until = max(
+                        self._paused_until, time.monotonic() + delay
+                    )
+                attempt += 1
+                self.stats.nb_retries += 1
+                await asyncio.sleep(delay)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the tokens budget once the real usage of a request is
+        known."""
+        if self.tokens_bucket is not None:
+            self.tokens_bucket.consume(actual_tokens - estimated_tokens)
+
+
+_DEFAULT_SCHEDULER: Optional[RequestScheduler] = None
+
+
+def _get_budget(variable_name: str) -> Optional[float]:
+    value = os.getenv(variable_name)
+    return None if not value else float(value)
+
+
+def get_default_scheduler() -> RequestScheduler:
+    """Process-wide scheduler shared by clients that were not given their
+    own."""
+    global _DEFAULT_SCHEDULER  # pylint: disable=global-statement
+    if _DEFAULT_SCHEDULER is None:
+        _DEFAULT_SCHEDULER = RequestScheduler(
+            requests_per_minute=_get_budget(REQUESTS_PER_MINUTE_ENV_VAR),
+            tokens_per_minute=_get_budget(TOKENS_PER_MINUTE_ENV_VAR),
+        )
+    return _DEFAULT_SCHEDULER
@@ -0,0 +1,281 @@
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Protocol, Union
+
+from .tokens import estimate_messages_tokens
+
+MAX_SESSIONS_DEFAULT = 1_000
+MAX_TURNS_PER_SESSION_DEFAULT = 50
+MAX_CHARS_DEFAULT = 20_000_000
+SESSION_TTL_SEC_DEFAULT = 24 * 3600
+
+
+@dataclass(frozen=True)
+class SessionKey:
+    """Identifies a conversation: one history per (workspace, channel, thread)."""
+
+    workspace_id: str = ""
+    channel_id: str = ""
+    thread_id: str = ""
+
+    def __str__(self) -> str:
+        return f"{self.workspace_id}:{self.channel_id}:{self.thread_id}"
+
+
+@dataclass
+class Turn:
+    """A user message and the matching assistant answer.
+
+    `nb_tokens` is estimated once at creation and cached with the turn.
+    """
+
+    messages: list[dict[str, str]]
+    created_at: float = field(default_factory=time.time)
+    nb_tokens: int = -1
+    summary: Optional[str] = field(default=None, compare=False)
+
+    def __post_init__(self):
+        if self.nb_tokens < 0:
+            self.nb_tokens = estimate_messages_tokens(self.messages)
+
+    @property
+    def nb_chars(self) -> int:
+        return sum(len(msg["content"]) for msg in self.messages)
+
+
+class SessionStore(Protocol):
+
+    def get_turns(self, key: SessionKey) -> list[Turn]:
+        """Return the turns of a conversation, oldest first."""
+        ...
+
+    def append_turn(self, key: SessionKey, turn: Turn) -> None:
+        """Add a turn to a conversation and apply the eviction policy."""
+        ...
+
+    def clear(self, key: SessionKey) -> None:
+        """Forget a conversation."""
+        ...
+
+
+@dataclass
+class _Session:
+    turns: list[Turn] = field(default_factory=list)
+    nb_chars: int = 0
+    last_access: float = field(default_factory=time.monotonic)
+
+
+class InMemorySessionStore(SessionStore):
+    """Conversation histories kept in process memory.
+
+    Eviction:
+    - a conversation keeps at most `max_turns_per_session` turns,
+    - conversations idle for more than `ttl_sec` are dropped,
+    - least recently used conversations are dropped beyond `max_sessions`
+      or when the stored text exceeds `max_chars` in total.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = MAX_SESSIONS_DEFAULT,
+        max_turns_per_session: int = MAX_TURNS_PER_SESSION_DEFAULT,
+        max_chars: int = MAX_CHARS_DEFAULT,
+        ttl_sec: float = SESSION_TTL_SEC_DEFAULT,
+    ):
+        self.max_sessions = max_sessions
+        self.max_turns_per_session = max_turns_per_session
+        self.max_chars = max_chars
+        self.ttl_sec = ttl_sec
+        self._sessions: OrderedDict[SessionKey, _Session] = OrderedDict()
+        self._nb_chars = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def nb_chars(self) -> int:
+        return self._nb_chars
+
+    def get_turns(self, key: SessionKey) -> list[Turn]:
+        self._evict_expired()
+        session = self._sessions.get(key)
+        if session is None:
+            return []
+        session.last_access = time.monotonic()
+        self._sessions.move_to_end(key)
+        return list(session.turns)
+
+    def append_turn(self, key: SessionKey, turn: Turn) -> None:
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = _Session()
+        session.turns.append(turn)
+        session.nb_chars += turn.nb_chars
+        self._nb_chars += turn.nb_chars
+        session.last_access = time.monotonic()
+        self._sessions.move_to_end(key)
+
+        while len(session.turns) > self.max_turns_per_session:
+            evicted = session.turns.pop(0)
+            session.nb_chars -= evicted.nb_chars
+            self._nb_chars -= evicted.nb_chars
+        self._evict_expired()
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or self._nb_chars > self.max_chars
+        ):
+            self._pop(next(iter(self._sessions)))
+
+    def clear(self, key: SessionKey) -> None:
+        if key in self._sessions:
+            self._pop(key)
+
+    def _pop(self, key: SessionKey) -> None:
+        session = self._sessions.pop(key)
+        self._nb_chars -= session.nb_chars
+
+    def _evict_expired(self) -> None:
+        # sessions are ordered by last access: stop at the first live one
+        limit = time.monotonic() - self.ttl_sec
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.last_access >= limit:
+                break
+            self._pop(key)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Conversation histories persisted in a SQLite database.
+
+    Same eviction policy as `InMemorySessionStore`. Useful to share
+    histories between worker processes or keep them across restarts.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = ":memory:",
+        max_sessions: int = MAX_SESSIONS_DEFAULT,
+        max_turns_per_session: int = MAX_TURNS_PER_SESSION_DEFAULT,
+        max_chars: int = MAX_CHARS_DEFAULT,
+        ttl_sec: float = SESSION_TTL_SEC_DEFAULT,
+    ):
+        self.max_sessions = max_sessions
+        self.max_turns_per_session = max_turns_per_session
+        self.max_chars = max_chars
+        self.ttl_sec = ttl_sec
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        if str(path) != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_key TEXT PRIMARY KEY,
+                last_access REAL NOT NULL,
+                nb_chars INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_key TEXT NOT NULL,
+                messages TEXT NOT NULL,
+                nb_chars INTEGER NOT NULL,
+                nb_tokens INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (session_key, id);
+            CREATE INDEX IF NOT EXISTS idx_sessions_access ON sessions (last_access);
+            """)
+        self.connection.commit()
+
+    def get_turns(self, key: SessionKey) -> list[Turn]:
+        self._evict_expired()
+        with self.connection:
+            updated = self.connection.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_key = ?",
+                (time.time(), str(key)),
+            )
+            if updated.rowcount == 0:
+                return []
+            rows = self.connection.execute(
+                "SELECT messages, created_at, nb_tokens FROM turns "
+                "WHERE session_key = ? ORDER BY id",
+                (str(key),),
+            ).fetchall()
+        return [
+            Turn(messages=json.loads(msgs), created_at=ts, nb_tokens=nb_tokens)
+            for msgs, ts, nb_tokens in rows
+        ]
+
+    def append_turn(self, key: SessionKey, turn: Turn) -> None:
+        session_key = str(key)
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO turns "
+                "(session_key, messages, nb_chars, nb_tokens, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    session_key,
+                    json.dumps(turn.messages),
+                    turn.nb_chars,
+                    turn.nb_tokens,
+                    turn.created_at,
+                ),
+            )
+            self.connection.execute(
+                "DELETE FROM turns WHERE session_key = ? AND id NOT IN ("
+                "SELECT id FROM turns WHERE session_key = ? ORDER BY id DESC LIMIT ?)",
+                (session_key, session_key, self.max_turns_per_session),
+            )
+            self.connection.execute(
+                "INSERT INTO sessions (session_key, last_access, nb_chars) "
+                "VALUES (?, ?, (SELECT SUM(nb_chars) FROM turns WHERE session_key = ?)) "
+                "ON CONFLICT(session_key) DO UPDATE SET "
+                "last_access = excluded.last_access, nb_chars = excluded.nb_chars",
+                (session_key, time.time(), session_key),
+            )
+        self._evict_expired()
+        self._evict_over_capacity()
+
+    def clear(self, key: SessionKey) -> None:
+        with self.connection:
+            self._delete_sessions([str(key)])
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _delete_sessions(self, session_keys: list[str]) -> None:
+        for session_key in session_keys:
+            self.connection.execute(
+                "DELETE FROM turns WHERE session_key = ?", (session_key,)
+            )
+            self.connection.execute(
+                "DELETE FROM sessions WHERE session_key = ?", (session_key,)
+            )
+
+    def _evict_expired(self) -> None:
+        limit = time.time() - self.ttl_sec
+        with self.connection:
+            rows = self.connection.execute(
+                "SELECT session_key FROM sessions WHERE last_access < ?", (limit,)
+            ).fetchall()
+            self._delete_sessions([row[0] for row in rows])
+
+    def _evict_over_capacity(self) -> None:
+        with self.connection:
+            nb_sessions, nb_chars = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nb_chars), 0) FROM sessions"
+            ).fetchone()
+            if nb_sessions <= self.max_sessions and nb_chars <= self.max_chars:
+                return
+            rows = self.connection.execute(
+                "SELECT session_key, nb_chars FROM sessions ORDER BY last_access"
+            ).fetchall()
+            to_delete: list[str] = []
+            for session_key, session_chars in rows:
+                if nb_sessions <= self.max_sessions and nb_chars <= self.max_chars:
+                    break
+                to_delete.append(session_key)
+                nb_sessions -= 1
+                nb_chars -= session_chars
+            self._delete_sessions(to_delete)
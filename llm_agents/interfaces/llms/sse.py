@@ -0,0 +1,114 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Collection, Optional, Union
+
+json_loads: Callable[[Union[bytes, str]], Any]
+try:
+    import orjson
+
+    json_loads = orjson.loads  # pylint: disable=no-member
+except ImportError:  # pragma: no cover
+    json_loads = json.loads
+
+DEFAULT_EVENT = "message"
+
+
+@dataclass(slots=True)
+class SSEEvent:
+    """A dispatched Server-Sent Event. `data` is left undecoded."""
+
+    event: str
+    data: bytes
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+    def json(self) -> Any:
+        return json_loads(self.data)
+
+
+class SSEParser:
+    """Incremental Server-Sent Events parser working on raw byte chunks.
+
+    Chunks may split lines anywhere: incomplete lines are kept until the
+    next `feed`. Supports `\\n` and `\\r\\n` line endings, multi-line `data`
+    fields, comments, `id` and `retry`. Events listed in `skip_events` are
+    dropped without building their data, and JSON decoding is left to the
+    consumer (`SSEEvent.json`, using orjson when installed) so it is only
+    paid for the events actually used.
+    """
+
+    def __init__(self, skip_events: Collection[str] = ()):
+        self.skip_events = frozenset(skip_events)
+        self.last_event_id: Optional[str] = None
+        self._buffer = b""
+        self._event = ""
+        self._data: list[bytes] = []
+        self._retry: Optional[int] = None
+
+    def feed(self, chunk: bytes) -> list[SSEEvent]:
+        """Parse a chunk and return the events it completes."""
+        buffer = self._buffer + chunk if self._buffer else chunk
+        if b"\r" in buffer:
+            buffer = buffer.replace(b"\r\n", b"\n")
+        end = buffer.rfind(b"\n\n")
+        if end < 0:
+            self._buffer = buffer
+            return []
+        self._buffer = buffer[end + 2 :]
+
+        events: list[SSEEvent] = []
+        for block in buffer[:end].split(b"\n\n"):
+            # fast path: "event: <name>\ndata: <data>", as sent by the Messages API
+            if block.startswith(b"event: "):
+                newline = block.find(b"\n")
+                if (
+                    newline > 0
+                    and block.startswith(b"data: ", newline + 1)
+                    and block.find(b"\n", newline + 1) < 0
+                ):
+                    event_name = block[7:newline].decode("utf-8")
+                    if event_name not in self.skip_events:
+                        events.append(
+                            SSEEvent(
+                                event_name, block[newline + 7 :], self.last_event_id
+                            )
+                        )
+                    continue
+            for line in block.split(b"\n"):
+                if line and line[0] != 58:  # b":" starts a comment
+                    self._parse_field(line)
+            event = self._dispatch()
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _parse_field(self, line: bytes) -> None:
+        name, sep, value = line.partition(b":")
+        if sep and value[:1] == b" ":
+            value = value[1:]
+        if name == b"data":
+            self._data.append(value)
+        elif name == b"event":
+            self._event = value.decode("utf-8")
+        elif name == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8")
+        elif name == b"retry":
+            if value.isdigit():
+                self._retry = int(value)
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        event_name = self._event or DEFAULT_EVENT
+        data = self._data
+        retry = self._retry
+        self._event = ""
+        self._data = []
+        self._retry = None
+        if not data or event_name in self.skip_events:
+            return None
+        return SSEEvent(
+            event=event_name,
+            data=data[0] if len(data) == 1 else b"\n".join(data),
+            id=self.last_event_id,
+            retry=retry,
+        )
@@ -0,0 +1,16 @@
+BYTES_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate of the number of tokens of a text.
+
+    Claude tokenizers average ~4 bytes of UTF-8 per token on English and
+    French text; counting bytes rather than characters over-estimates
+    accented or non-latin text, which is the safe side for a budget.
+    """
+    return len(text.encode("utf-8")) // BYTES_PER_TOKEN + 1
+
+
+def estimate_messages_tokens(messages: list[dict[str, str]]) -> int:
+    return sum(estimate_tokens(msg["content"]) + TOKENS_PER_MESSAGE for msg in messages)
@@ -1 +1,12 @@
 from .strings import StringOps
+from .fair_queue import FairQueue
+from .http import PooledSession, get_default_pool
+from .rate_limit import TokenBucket
+from .deadline import (
+    Deadline,
+    DeadlineExceededError,
+    current_deadline,
+    deadline_scope,
+    enforce_deadline,
+    is_deadline_exceeded,
+)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceededError(TimeoutError):
+    """The work was stopped because its deadline expired."""
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """Point in time (of `time.monotonic`) by which some work must be done.
+
+    A deadline is only meaningful within the process which created it.
+    """
+
+    expires_at: float
+
+    @classmethod
+    def after(cls, timeout_sec: float) -> "Deadline":
+        return cls(time.monotonic() + timeout_sec)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self) -> None:
+        """Raise DeadlineExceededError if the deadline has expired."""
+        if self.expired:
+            raise DeadlineExceededError("Deadline exceeded")
+
+
+def earliest(*deadlines: Optional[Deadline]) -> Optional[Deadline]:
+    """The tightest of the deadlines, None if there is none."""
+    return min(
+        (d for d in deadlines if d is not None),
+        key=lambda d: d.expires_at,
+        default=None,
+    )
+
+
+# deadline of the work running in the current task, read by the clients
+# (LLMs, databases) which were not given one explicitly
+_CURRENT_DEADLINE: ContextVar[Optional[Deadline]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _CURRENT_DEADLINE.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[None]:
+    """Make `deadline` (tightened by the current one) the current deadline.
+    Tasks created in the scope inherit it."""
+    token = _CURRENT_DEADLINE.set(earliest(deadline, current_deadline()))
+    try:
+        yield
+    finally:
+        _CURRENT_DEADLINE.reset(token)
+
+
+@asynccontextmanager
+async def enforce_deadline(deadline: Optional[Deadline]) -> AsyncIterator[None]:
+    """Cancel the enclosed work when the deadline expires, raising a
+    DeadlineExceededError instead. Does nothing without a deadline."""
+    if deadline is None:
+        yield
+        return
+    deadline.check()
+    # the deadline is on the `time.monotonic` clock, the loop has its own
+    loop = asyncio.get_running_loop()
+    timeout = asyncio.timeout_at(loop.time() + deadline.remaining())
+    try:
+        async with timeout:
+            yield
+    except TimeoutError as e:
+        if isinstance(e, DeadlineExceededError) or not timeout.expired():
+            raise
+        raise DeadlineExceededError("Deadline exceeded") from e
+
+
+async def iterate_until(
+    iterator: AsyncIterator[T], deadline: Optional[Deadline]
+) -> AsyncIterator[T]:
+    """Yield from `iterator`, raising DeadlineExceededError if an item does
+    not come before the deadline."""
+    while True:
+        try:
+            async with enforce_deadline(deadline):
+                item = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        yield item
+
+
+def is_deadline_exceeded(error: Optional[BaseException]) -> bool:
+    """Whether the error, or one of the errors it was raised from, is a
+    DeadlineExceededError. Other timeouts (e.g. of a single HTTP read) are
+    ordinary, possibly retryable, errors."""
+    while error is not None:
+        if isinstance(error, DeadlineExceededError):
+            return True
+        error = error.__cause__
+    return False
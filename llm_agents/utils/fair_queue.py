@@ -0,0 +1,79 @@
+from collections import OrderedDict, deque
+from typing import Generic, Hashable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class FairQueue(Generic[T]):
+    """Queue with priority classes and round-robin between keys.
+
+    Items of a lower `priority` value are always served first. Within a
+    priority class, keys (e.g. Slack workspaces) are served in turn so one
+    busy key cannot starve the others; items of a same key stay FIFO.
+    """
+
+    def __init__(self):
+        self._queues: dict[int, OrderedDict[Hashable, deque[T]]] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[T]:
+        """All the queued items, not in serving order."""
+        for keys in self._queues.values():
+            for items in keys.values():
+                yield from items
+
+    def qsize_by_priority(self) -> dict[int, int]:
+        return {
+            priority: sum(len(items) for items in keys.values())
+            for priority, keys in sorted(self._queues.items())
+        }
+
+    def qsize_by_key(self) -> dict[Hashable, int]:
+        sizes: dict[Hashable, int] = {}
+        for keys in self._queues.values():
+            for key, items in keys.items():
+                sizes[key] = sizes.get(key, 0) + len(items)
+        return sizes
+
+    def put(self, item: T, key: Hashable = "", priority: int = 0) -> None:
+        keys = self._queues.setdefault(priority, OrderedDict())
+        if key not in keys:
+            keys[key] = deque()
+        keys[key].append(item)
+        self._size += 1
+
+    def pop(self) -> T:
+        """Remove and return the next item. Raises IndexError if empty."""
+        if not self._size:
+            raise IndexError("pop from an empty FairQueue")
+        priority = min(self._queues)
+        keys = self._queues[priority]
+        key, items = next(iter(keys.items()))
+        item = items.popleft()
+        if items:
+            keys.move_to_end(key)
+        else:
+            del keys[key]
+            if not keys:
+                del self._queues[priority]
+        self._size -= 1
+        return item
+
+    def remove(self, item: T, key: Hashable = "", priority: int = 0) -> bool:
+        """Remove a queued item, e.g. a cancelled waiter. O(n) in its key."""
+        keys = self._queues.get(priority)
+        if keys is None or key not in keys:
+            return False
+        try:
+            keys[key].remove(item)
+        except ValueError:
+            return False
+        if not keys[key]:
+            del keys[key]
+            if not keys:
+                del self._queues[priority]
+        self._size -= 1
+        return True
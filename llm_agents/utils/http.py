@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any, Optional
+
+import aiohttp
+
+CONNECTION_LIMIT_DEFAULT = 100
+CONNECTION_LIMIT_PER_HOST_DEFAULT = 20
+KEEPALIVE_TIMEOUT_SEC_DEFAULT = 60
+DNS_CACHE_TTL_SEC_DEFAULT = 300
+
+
+class PooledSession:
+    """Lazily created `aiohttp.ClientSession`s with a bounded connection pool.
+
+    Each event loop gets its own session, created on first use (and again if
+    it was closed), so a pool can safely be shared at the process level, even
+    by threads running their own loop. The sessions of closed loops are
+    closed when a new session is created. Use `aclose()` or `async with` to
+    release the connections.
+    """
+
+    def __init__(
+        self,
+        connection_limit: int = CONNECTION_LIMIT_DEFAULT,
+        connection_limit_per_host: int = CONNECTION_LIMIT_PER_HOST_DEFAULT,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT_SEC_DEFAULT,
+        dns_cache_ttl: int = DNS_CACHE_TTL_SEC_DEFAULT,
+    ):
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._sessions: dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+    async def __aenter__(self) -> "PooledSession":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the session of the running event loop."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            self._close_stale_sessions()
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[loop] = session
+        return session
+
+    def _close_stale_sessions(self) -> None:
+        for loop, session in list(self._sessions.items()):
+            if loop.is_closed() or session.closed:
+                del self._sessions[loop]
+                if not session.closed:
+                    _close_from_other_loop(session, loop)
+
+    async def release(self) -> None:
+        """Close the session of the running event loop, e.g. before the loop
+        ends. The other loops keep theirs."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def aclose(self) -> None:
+        await self.release()
+        sessions, self._sessions = self._sessions, {}
+        for loop, session in sessions.items():
+            if not session.closed:
+                _close_from_other_loop(session, loop)
+
+
+def _close_from_other_loop(
+    session: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop
+) -> None:
+    """Close a session created in another event loop, without awaiting it."""
+    if loop.is_running():
+        # running in another thread: close it there
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+        return
+    connector = session.connector
+    session.detach()
+    if connector is not None:
+        # closes the connections, unless their loop is closed already: they
+        # are only dropped then
+        connector._close()  # pylint: disable=protected-access
+
+
+_DEFAULT_POOL: Optional[PooledSession] = None
+
+
+def get_default_pool() -> PooledSession:
+    """Process-wide pool shared by clients that were not given their own."""
+    global _DEFAULT_POOL  # pylint: disable=global-statement
+    if _DEFAULT_POOL is None:
+        _DEFAULT_POOL = PooledSession()
+    return _DEFAULT_POOL
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Asynchronous token bucket.
+
+    Holds at most `capacity` tokens and refills at `rate` tokens per second.
+    `acquire` waits (in FIFO order) until enough tokens are available instead
+    of failing, so excess work is queued rather than rejected. The waiters'
+    lock is created for the running event loop, so a bucket can be shared at
+    the process level.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("TokenBucket rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def per_minute(cls, amount: float) -> "TokenBucket":
+        """Bucket allowing `amount` per minute, with bursts up to `amount`."""
+        return cls(rate=amount / 60, capacity=amount)
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Lock of the waiters. Must be called from a running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def time_until_available(self, amount: float = 1) -> float:
+        self._refill()
+        missing = min(amount, self.capacity) - self._tokens
+        return max(0.0, missing / self.rate)
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        self._refill()
+        if self._tokens < amount:
+            return False
+        self._tokens -= amount
+        return True
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Wait until `amount` tokens are available and take them.
+
+        Amounts larger than the capacity wait for a full bucket and leave it
+        in debt. Returns the time spent waiting, in seconds.
+        """
+        start = time.monotonic()
+        async with self.lock:
+            while True:
+                wait_sec = self.time_until_available(amount)
+                if wait_sec <= 0:
+                    break
+                await asyncio.sleep(wait_sec)
+            self._tokens -= amount
+        return time.monotonic() - start
+
+    def consume(self, amount: float) -> None:
+        """Adjust the bucket without waiting (negative amounts give tokens back).
+
+        Used to correct an estimate once the real cost of a request is known.
+        """
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
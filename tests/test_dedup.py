@@ -0,0 +1,103 @@
+from typing import Any, Iterator
+
+import pytest
+
+from llm_agents.interfaces.bots import dedup
+from llm_agents.interfaces.bots.dedup import (
+    EventDeduplicator,
+    InMemorySeenEventStore,
+    SeenEventStore,
+    SQLiteSeenEventStore,
+)
+
+TTL_SEC = 60.0
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    # the in-memory store uses the monotonic clock, the SQLite one wall time
+    monkeypatch.setattr(dedup.time, "monotonic", clock)
+    monkeypatch.setattr(dedup.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request: pytest.FixtureRequest) -> Iterator[SeenEventStore]:
+    if request.param == "memory":
+        yield InMemorySeenEventStore(ttl_sec=TTL_SEC)
+        return
+    sqlite_store = SQLiteSeenEventStore(ttl_sec=TTL_SEC)
+    yield sqlite_store
+    sqlite_store.close()
+
+
+def event(event_id: str, channel: str = "C1", ts: str = "1.0") -> dict[str, Any]:
+    return {"event_id": event_id, "event": {"channel": channel, "ts": ts}}
+
+
+def test_events_expire_after_ttl(clock: FakeClock, store: SeenEventStore) -> None:
+    assert store.add("Ev1")
+    clock.now += TTL_SEC - 1
+    assert not store.add("Ev1")
+    clock.now += 1
+    assert store.add("Ev1")
+    # the TTL starts over from the new recording
+    clock.now += TTL_SEC - 1
+    assert not store.add("Ev1")
+
+
+def test_discard(clock: FakeClock, store: SeenEventStore) -> None:
+    assert store.add("Ev1")
+    store.discard("Ev1")
+    assert store.add("Ev1")
+
+
+def test_in_memory_store_is_bounded(clock: FakeClock) -> None:
+    store = InMemorySeenEventStore(ttl_sec=TTL_SEC, max_events=2)
+    for event_id in ["Ev1", "Ev2", "Ev3"]:
+        assert store.add(event_id)
+    assert len(store) == 2
+    assert store.add("Ev1")  # the oldest one was evicted
+
+
+def test_in_memory_store_drops_expired_events(clock: FakeClock) -> None:
+    store = InMemorySeenEventStore(ttl_sec=TTL_SEC)
+    store.add("Ev1")
+    clock.now += TTL_SEC
+    store.add("Ev2")
+    assert len(store) == 1
+
+
+def test_duplicate_events(clock: FakeClock) -> None:
+    deduplicator = EventDeduplicator(InMemorySeenEventStore(ttl_sec=TTL_SEC))
+    assert not deduplicator.is_duplicate(event("Ev1"))
+    assert deduplicator.is_duplicate(event("Ev1"), {"X-Slack-Retry-Num": "1"})
+    clock.now += TTL_SEC
+    assert not deduplicator.is_duplicate(event("Ev1"))
+    assert not deduplicator.is_duplicate({"type": "url_verification"})
+    stats = deduplicator.stats
+    assert (stats.nb_events, stats.nb_duplicates, stats.nb_retries) == (3, 1, 1)
+
+
+def test_same_message_under_two_event_ids(clock: FakeClock) -> None:
+    # `message` and `app_mention` events of a mention of the bot
+    deduplicator = EventDeduplicator(InMemorySeenEventStore(ttl_sec=TTL_SEC))
+    assert not deduplicator.is_duplicate(event("Ev1"))
+    assert deduplicator.is_duplicate(event("Ev2"))
+    assert not deduplicator.is_duplicate(event("Ev3", ts="2.0"))
+
+
+def test_forgotten_event_is_processed_again(clock: FakeClock) -> None:
+    deduplicator = EventDeduplicator(InMemorySeenEventStore(ttl_sec=TTL_SEC))
+    assert not deduplicator.is_duplicate(event("Ev1"))
+    deduplicator.forget(event("Ev1"))
+    assert not deduplicator.is_duplicate(event("Ev1"), {"X-Slack-Retry-Num": "1"})
@@ -0,0 +1,127 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from llm_agents.dags._base import AgentIO
+from llm_agents.dags.engine import (
+    DAGCycleError,
+    DAGDefinitionError,
+    DAGEngine,
+    DAGNode,
+    DAGNodeError,
+    topological_order,
+)
+from llm_agents.interfaces.bots._base import UserInput
+from llm_agents.interfaces.llms.limiter import Priority
+from llm_agents.interfaces.llms.scheduler import RetryPolicy
+from llm_agents.utils.deadline import DeadlineExceededError
+
+NO_DELAY = RetryPolicy(max_retries=2, base_delay_sec=0)
+
+
+class FakeAgent:
+    """Records its runs in `agent_io.data["log"]`. `fail` first attempts of
+    the node raise, `hang` first attempts never finish."""
+
+    PRIORITY = Priority.BACKGROUND
+    attempts: dict[str, int] = {}
+
+    def __init__(self, task_tag: str, agent_io: AgentIO, **kwargs: Any):
+        self.name = task_tag
+        self.agent_io = agent_io
+
+    async def execute(self, fail: int = 0, hang: int = 0) -> AgentIO:
+        attempt = self.attempts[self.name] = self.attempts.get(self.name, 0) + 1
+        log = self.agent_io.data.setdefault("log", [])
+        log.append(f"start {self.name}")
+        await asyncio.sleep(0)
+        if attempt <= hang:
+            await asyncio.Event().wait()
+        if attempt <= fail:
+            raise ValueError(f"{self.name} failed")
+        log.append(f"end {self.name}")
+        return self.agent_io
+
+
+@pytest.fixture(autouse=True)
+def reset_attempts() -> None:
+    FakeAgent.attempts.clear()
+
+
+def node(name: str, *depends_on: str, **kwargs: Any) -> DAGNode:
+    execute_kwargs = {k: kwargs.pop(k) for k in ("fail", "hang") if k in kwargs}
+    return DAGNode(
+        name,
+        FakeAgent,  # type: ignore[arg-type]
+        depends_on,
+        execute_kwargs=execute_kwargs,
+        **kwargs,
+    )
+
+
+def run(engine: DAGEngine) -> AgentIO:
+    agent_io = AgentIO(UserInput("hello", channel_id="C1"), object())  # type: ignore[arg-type]
+    return asyncio.run(engine.run(agent_io, run_id="run"))
+
+
+def test_topological_order() -> None:
+    nodes = [node("d", "b", "c"), node("b", "a"), node("c", "a"), node("a")]
+    assert topological_order(nodes) == ["a", "b", "c", "d"]
+
+
+@pytest.mark.parametrize(
+    "nodes, error",
+    [
+        ([node("a", "b"), node("b", "a")], DAGCycleError),
+        ([node("a", "missing")], DAGDefinitionError),
+        ([node("a"), node("a")], DAGDefinitionError),
+    ],
+)
+def test_invalid_dags(nodes: list[DAGNode], error: type[Exception]) -> None:
+    with pytest.raises(error):
+        DAGEngine(nodes)
+
+
+def test_nodes_run_after_their_dependencies() -> None:
+    engine = DAGEngine(
+        [node("a"), node("b", "a"), node("c", "a"), node("d", "b", "c")],
+        show_progress=False,
+    )
+    log = run(engine).data["log"]
+    for before, after in [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")]:
+        assert log.index(f"end {before}") < log.index(f"start {after}")
+    # independent branches run concurrently
+    assert log.index("start c") < log.index("end b")
+
+
+def test_failing_node_is_retried() -> None:
+    engine = DAGEngine([node("a", fail=2, retry=NO_DELAY)], show_progress=False)
+    assert run(engine).data["log"][-1] == "end a"
+    assert FakeAgent.attempts["a"] == 3
+
+
+def test_node_fails_once_out_of_retries() -> None:
+    engine = DAGEngine(
+        [node("a", fail=3, retry=NO_DELAY), node("b", "a")], show_progress=False
+    )
+    with pytest.raises(DAGNodeError) as error:
+        run(engine)
+    assert error.value.node == "a"
+    assert isinstance(error.value.__cause__, ValueError)
+    assert "b" not in FakeAgent.attempts
+
+
+def test_node_timeout() -> None:
+    engine = DAGEngine([node("a", hang=1, timeout_sec=0.01)], show_progress=False)
+    with pytest.raises(DAGNodeError) as error:
+        run(engine)
+    assert isinstance(error.value.__cause__, DeadlineExceededError)
+
+
+def test_timed_out_node_is_retried() -> None:
+    engine = DAGEngine(
+        [node("a", hang=1, timeout_sec=0.01, retry=NO_DELAY)], show_progress=False
+    )
+    assert run(engine).data["log"][-1] == "end a"
+    assert FakeAgent.attempts["a"] == 2
@@ -0,0 +1,159 @@
+import pytest
+
+from llm_agents.dags import job_store
+from llm_agents.dags.job_store import JobStatus, SQLiteJobStore
+from llm_agents.interfaces.bots._base import UserInput
+
+LEASE_SEC = 10.0
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake_clock = FakeClock()
+    monkeypatch.setattr(job_store.time, "time", fake_clock.time)
+    return fake_clock
+
+
+@pytest.fixture
+def store(clock: FakeClock) -> SQLiteJobStore:
+    return SQLiteJobStore(lease_sec=LEASE_SEC, max_attempts=3)
+
+
+def add_job(store: SQLiteJobStore) -> int:
+    return store.add(UserInput(message="hello", channel_id="C1", workspace_id="W1"))
+
+
+def status(store: SQLiteJobStore, job_id: int) -> JobStatus:
+    job = store.get(job_id)
+    assert job is not None
+    return job.status
+
+
+def test_add_and_get(store: SQLiteJobStore) -> None:
+    job_id = add_job(store)
+    job = store.get(job_id)
+    assert job is not None
+    assert job.status == JobStatus.PENDING
+    assert job.attempts == 0
+    assert job.user_input.message == "hello"
+    assert store.get(job_id + 1) is None
+
+
+def test_lease_is_exclusive(store: SQLiteJobStore) -> None:
+    job_id = add_job(store)
+    assert store.lease(job_id)
+    assert not store.lease(job_id)
+    assert status(store, job_id) == JobStatus.RUNNING
+
+
+def test_ack(store: SQLiteJobStore) -> None:
+    job_id = add_job(store)
+    store.lease(job_id)
+    store.ack(job_id)
+    assert status(store, job_id) == JobStatus.DONE
+    assert not store.lease(job_id)
+    assert store.recover() == []
+
+
+def test_nack_retries_until_max_attempts(store: SQLiteJobStore) -> None:
+    job_id = add_job(store)
+    for _ in range(2):
+        assert store.lease(job_id)
+        assert store.nack(job_id, "boom") == JobStatus.PENDING
+    assert store.lease(job_id)
+    assert store.nack(job_id, "boom") == JobStatus.FAILED
+    job = store.get(job_id)
+    assert job is not None and job.error == "boom" and job.attempts == 3
+    assert not store.lease(job_id)
+
+
+def test_release_does_not_count_the_attempt(store: SQLiteJobStore) -> None:
+    job_id = add_job(store)
+    store.lease(job_id)
+    store.release(job_id)
+    job = store.get(job_id)
+    assert job is not None
+    assert job.status == JobStatus.PENDING
+    assert job.attempts == 0
+    assert [job.job_id for job in store.recover()] == [job_id]
+
+
+def test_fail(store: SQLiteJobStore) -> None:
+    job_id = add_job(store)
+    store.lease(job_id)
+    store.fail(job_id, "timeout")
+    assert status(store, job_id) == JobStatus.FAILED
+    assert store.recover() == []
+
+
+def test_recover_expired_lease(store: SQLiteJobStore, clock: FakeClock) -> None:
+    job_id = add_job(store)
+    store.lease(job_id)
+    assert store.recover() == []  # leased by a live worker
+    clock.now += LEASE_SEC / 2
+    store.renew(job_id)
+    clock.now += LEASE_SEC / 2 + 1
+    assert store.recover() == []  # the lease was renewed
+    clock.now += LEASE_SEC
+    assert [job.job_id for job in store.recover()] == [job_id]
+    assert store.lease(job_id)
+
+
+def test_crashing_job_is_not_recovered_forever(
+    store: SQLiteJobStore, clock: FakeClock
+) -> None:
+    job_id = add_job(store)
+    for _ in range(3):
+        assert [job.job_id for job in store.recover()] == [job_id]
+        assert store.lease(job_id)
+        clock.now += LEASE_SEC + 1  # the worker died without acking
+    assert store.recover() == []
+    assert not store.lease(job_id)
+    job = store.get(job_id)
+    assert job is not None
+    assert job.status == JobStatus.FAILED
+    assert job.error == job_store.EXHAUSTED_ERROR
+
+
+def test_expired_lease_of_exhausted_job_is_failed_on_lease(
+    store: SQLiteJobStore, clock: FakeClock
+) -> None:
+    job_id = add_job(store)
+    for _ in range(3):
+        assert store.lease(job_id)
+        clock.now += LEASE_SEC + 1
+    assert not store.lease(job_id)
+    assert status(store, job_id) == JobStatus.FAILED
+
+
+def test_done_jobs_are_purged(clock: FakeClock) -> None:
+    store = SQLiteJobStore(done_jobs_ttl_sec=60)
+    job_id = add_job(store)
+    store.lease(job_id)
+    store.ack(job_id)
+    clock.now += 61
+    store.recover()
+    assert store.get(job_id) is None
+
+
+def test_message_id_is_kept_for_the_next_attempt(
+    store: SQLiteJobStore, clock: FakeClock
+) -> None:
+    job_id = add_job(store)
+    store.lease(job_id)
+    store.renew(job_id)  # nothing posted yet
+    store.renew(job_id, "1.0001")
+    store.release(job_id)  # the message ID is kept when not given again
+    assert [job.message_id for job in store.recover()] == ["1.0001"]
+    store.lease(job_id)
+    store.nack(job_id, "boom", "1.0002")
+    job = store.get(job_id)
+    assert job is not None and job.message_id == "1.0002"
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from llm_agents.interfaces.llms.limiter import (
+    ConcurrencyLimiter,
+    Priority,
+    current_priority,
+    priority_scope,
+)
+from llm_agents.utils.fair_queue import FairQueue
+
+
+def drain(queue: FairQueue[str]) -> list[str]:
+    return [queue.pop() for _ in range(len(queue))]
+
+
+def test_fair_queue_serves_priorities_first() -> None:
+    queue: FairQueue[str] = FairQueue()
+    queue.put("background", priority=Priority.BACKGROUND)
+    queue.put("interactive", priority=Priority.INTERACTIVE)
+    assert drain(queue) == ["interactive", "background"]
+
+
+def test_fair_queue_round_robin_between_keys() -> None:
+    queue: FairQueue[str] = FairQueue()
+    for i in range(3):
+        queue.put(f"busy{i}", key="busy")
+    queue.put("quiet0", key="quiet")
+    queue.put("quiet1", key="quiet")
+    assert drain(queue) == ["busy0", "quiet0", "busy1", "quiet1", "busy2"]
+    with pytest.raises(IndexError):
+        queue.pop()
+
+
+def test_fair_queue_remove() -> None:
+    queue: FairQueue[str] = FairQueue()
+    queue.put("a", key="k")
+    queue.put("b", key="k")
+    assert queue.remove("a", key="k")
+    assert not queue.remove("a", key="k")
+    assert not queue.remove("b", key="other")
+    assert queue.qsize_by_key() == {"k": 1}
+    assert drain(queue) == ["b"]
+
+
+def test_priority_scope() -> None:
+    assert current_priority() == Priority.INTERACTIVE
+    with priority_scope(Priority.BACKGROUND):
+        assert current_priority() == Priority.BACKGROUND
+    assert current_priority() == Priority.INTERACTIVE
+
+
+async def acquire_all(
+    limiter: ConcurrencyLimiter, requests: list[tuple[str, Priority, str]]
+) -> list[str]:
+    """Queue the requests behind a held slot, then release it: returns the
+    order in which they were served."""
+    served: list[str] = []
+
+    async def request(name: str, priority: Priority, workspace_id: str) -> None:
+        async with limiter.slot(priority, workspace_id):
+            served.append(name)
+
+    await limiter.acquire()  # the only slot
+    tasks = [asyncio.create_task(request(*r)) for r in requests]
+    await asyncio.sleep(0)  # every request is waiting
+    assert limiter.metrics.queue_depth == len(requests)
+    limiter.release()
+    await asyncio.gather(*tasks)
+    return served
+
+
+def test_limiter_serves_interactive_requests_first() -> None:
+    requests = [
+        ("dag step", Priority.BACKGROUND, "W1"),
+        ("reply", Priority.INTERACTIVE, "W1"),
+        ("batch", Priority.BACKGROUND, "W2"),
+    ]
+    served = asyncio.run(acquire_all(ConcurrencyLimiter(1), requests))
+    assert served == ["reply", "dag step", "batch"]
+
+
+def test_limiter_is_fair_between_workspaces() -> None:
+    requests = [(f"W1-{i}", Priority.BACKGROUND, "W1") for i in range(3)]
+    requests += [("W2-0", Priority.BACKGROUND, "W2")]
+    served = asyncio.run(acquire_all(ConcurrencyLimiter(1), requests))
+    assert served == ["W1-0", "W2-0", "W1-1", "W1-2"]
+
+
+def test_limiter_cancelled_waiter_gives_up_its_place() -> None:
+    async def main() -> None:
+        limiter = ConcurrencyLimiter(1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert limiter.metrics.queue_depth == 0
+        limiter.release()
+        assert limiter.metrics.in_flight == 0
+
+    asyncio.run(main())
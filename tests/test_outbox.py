@@ -0,0 +1,121 @@
+import asyncio
+import time
+from typing import Any, Coroutine, TypeVar
+
+import pytest
+
+from llm_agents.interfaces.bots._base import MessageContext
+from llm_agents.interfaces.bots.outbox import MessageOutbox
+
+CALLS_PER_SEC = 1.0
+BURST = 2
+
+T = TypeVar("T")
+
+
+class FakeClock:
+    """Virtual `time.monotonic`, shared with the event loop of `run`: when
+    every task waits, time jumps to the next timer instead of sleeping."""
+
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        with asyncio.Runner(loop_factory=self._new_event_loop) as runner:
+            return runner.run(coroutine)
+
+    def _new_event_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.new_event_loop()
+        selector = loop._selector  # type: ignore[attr-defined]  # pylint: disable=protected-access
+        select = selector.select
+
+        def advance_and_select(timeout: Any = None) -> Any:
+            if timeout:
+                self.now += timeout
+                timeout = 0
+            return select(timeout)
+
+        selector.select = advance_and_select
+        return loop
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    # also the clock of the event loop
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+class FakeBot:
+    def __init__(self, clock: FakeClock) -> None:
+        self.clock = clock
+        self.sent: list[tuple[str, str]] = []
+        self.sent_at: list[float] = []
+
+    async def send_message(self, context: MessageContext, **kwargs: Any) -> str:
+        message_id = context.message_id or f"m{len(self.sent)}"
+        self.sent.append((message_id, context.header))
+        self.sent_at.append(self.clock.now)
+        return message_id
+
+
+def make_outbox(clock: FakeClock) -> tuple[FakeBot, MessageOutbox]:
+    bot = FakeBot(clock)
+    return bot, MessageOutbox(bot, calls_per_sec=CALLS_PER_SEC, burst=BURST)  # type: ignore[arg-type]
+
+
+def test_frames_are_coalesced(clock: FakeClock) -> None:
+    async def main() -> None:
+        bot, outbox = make_outbox(clock)
+        context = MessageContext(channel_id="C1", message_id="m1")
+        for header in ["a", "b", "c"]:
+            context.header = header
+            outbox.submit(context)
+        await outbox.flush(context)
+        assert bot.sent == [("m1", "c")]
+        assert outbox.stats.nb_superseded == 2
+        await outbox.aclose()
+
+    clock.run(main())
+
+
+def test_idle_channels_are_dropped(clock: FakeClock) -> None:
+    async def main() -> None:
+        bot, outbox = make_outbox(clock)
+        for i in range(10):
+            outbox.submit(MessageContext(channel_id=f"C{i}", message_id="m1"))
+        await outbox.send(MessageContext(channel_id="C-new"))
+        await outbox.flush()
+        assert len(bot.sent) == 11
+        # the channels are kept until their bucket is full again
+        await asyncio.sleep(1 / CALLS_PER_SEC - 0.01)
+        assert len(outbox._channels) == 11  # pylint: disable=protected-access
+        await asyncio.sleep(0.02)
+        assert not outbox._channels  # pylint: disable=protected-access
+
+    clock.run(main())
+
+
+def test_channel_is_kept_while_paced(clock: FakeClock) -> None:
+    async def main() -> None:
+        bot, outbox = make_outbox(clock)
+        start = clock.now
+        for i in range(BURST + 1):
+            outbox.submit(MessageContext(channel_id="C1", message_id=f"m{i}"))
+        await outbox.flush()
+        # the burst is spent: the channel (and its bucket) is still there
+        assert "C1" in outbox._channels  # pylint: disable=protected-access
+        outbox.submit(MessageContext(channel_id="C1", message_id="m9"))
+        await asyncio.sleep(0)
+        assert len(bot.sent) == BURST + 1  # paced, not sent right away
+        await outbox.flush()
+        assert len(bot.sent) == BURST + 2
+        await outbox.aclose()
+        # the burst goes out at once, then one call every 1 / CALLS_PER_SEC
+        assert [t - start for t in bot.sent_at] == pytest.approx([0, 0, 1, 2])
+
+    clock.run(main())
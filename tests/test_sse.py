@@ -0,0 +1,62 @@
+from llm_agents.interfaces.llms.sse import SSEEvent, SSEParser
+
+STREAM = (
+    b"event: message_start\n"
+    b'data: {"type": "message_start"}\n'
+    b"\n"
+    b": a comment\n"
+    b"event: content_block_delta\n"
+    b"id: 7\n"
+    b"data: first line\n"
+    b"data: second line\n"
+    b"\n"
+    b"data: no event name\n"
+    b"retry: 3000\n"
+    b"\n"
+)
+EXPECTED = [
+    SSEEvent("message_start", b'{"type": "message_start"}'),
+    SSEEvent("content_block_delta", b"first line\nsecond line", id="7"),
+    SSEEvent("message", b"no event name", id="7", retry=3000),
+]
+
+
+def parse(chunks: list[bytes], **kwargs: object) -> list[SSEEvent]:
+    parser = SSEParser(**kwargs)  # type: ignore[arg-type]
+    events: list[SSEEvent] = []
+    for chunk in chunks:
+        events += parser.feed(chunk)
+    return events
+
+
+def test_whole_stream() -> None:
+    assert parse([STREAM]) == EXPECTED
+
+
+def test_frames_split_across_chunks() -> None:
+    for split in range(1, len(STREAM)):
+        assert parse([STREAM[:split], STREAM[split:]]) == EXPECTED, split
+    assert parse([STREAM[i : i + 1] for i in range(len(STREAM))]) == EXPECTED
+
+
+def test_crlf_line_endings() -> None:
+    stream = STREAM.replace(b"\n", b"\r\n")
+    assert parse([stream]) == EXPECTED
+    # a CRLF split between two chunks
+    for split in range(1, len(stream)):
+        assert parse([stream[:split], stream[split:]]) == EXPECTED, split
+
+
+def test_incomplete_event_is_kept() -> None:
+    parser = SSEParser()
+    assert parser.feed(b"event: ping\ndata: {}\n") == []
+    assert parser.feed(b"\n") == [SSEEvent("ping", b"{}")]
+
+
+def test_skip_events() -> None:
+    events = parse([STREAM], skip_events={"content_block_delta"})
+    assert [event.event for event in events] == ["message_start", "message"]
+
+
+def test_json() -> None:
+    assert EXPECTED[0].json() == {"type": "message_start"}